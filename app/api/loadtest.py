@@ -0,0 +1,102 @@
+"""
+Load test of the read API against a local database: samples cases from `scc_cases`, requests them with a skewed
+(hot cases first) distribution from many threads and reports requests/sec, latencies and the cache hit rate.
+
+Usage:
+    python -m app.api.server --port 8000 &
+    python -m app.api.loadtest --url http://localhost:8000 --threads 32 --duration 60
+"""
+import argparse
+import random
+import threading
+import time
+from urllib.parse import quote, urlencode
+
+import requests
+from sqlalchemy import text
+
+from app.db.database import ReadSession
+
+
+def sample_paths(cases: int) -> list[str]:
+    with ReadSession() as session:
+        rows = session.execute(text(
+            "SELECT scc_id, court_name, date FROM scc_cases TABLESAMPLE SYSTEM (1) LIMIT :limit"
+        ), {"limit": cases}).all()
+
+    paths = []
+    for row in rows:
+        paths.append(f"/cases/{quote(row.scc_id, safe='')}")
+        paths.append(f"/cases/{quote(row.scc_id, safe='')}/citations")
+        if row.court_name and row.date:
+            paths.append(f"/cases?{urlencode({'court': row.court_name, 'date': row.date.isoformat()})}")
+    return paths
+
+
+def run(url: str, paths: list[str], threads: int, duration: float, skew: float) -> tuple[list[float], int]:
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    # Pareto weights, a few paths get most of the traffic like hot cases do
+    weights = [1 / (rank + 1) ** skew for rank in range(len(paths))]
+
+    def worker():
+        session = requests.Session()
+        local_latencies, local_errors = [], 0
+        while time.monotonic() < deadline:
+            path = random.choices(paths, weights)[0]
+            started = time.monotonic()
+            try:
+                response = session.get(url + path, timeout=(5, 30))
+                if response.status_code >= 500:
+                    local_errors += 1
+            except requests.RequestException:
+                local_errors += 1
+            local_latencies.append(time.monotonic() - started)
+
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    return latencies, errors[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the read API.")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--cases", type=int, default=1000, help="Number of cases to sample")
+    parser.add_argument("--skew", type=float, default=1.1, help="Pareto exponent of the access distribution")
+    args = parser.parse_args()
+
+    paths = sample_paths(args.cases)
+    if not paths:
+        print("No cases to request, is scc_cases empty?")
+        return
+    random.shuffle(paths)
+
+    stats_before = requests.get(f"{args.url}/stats", timeout=5).json()
+    latencies, errors = run(args.url, paths, args.threads, args.duration, args.skew)
+    stats_after = requests.get(f"{args.url}/stats", timeout=5).json()
+
+    latencies.sort()
+    hits = stats_after["hits"] - stats_before["hits"]
+    lookups = hits + stats_after["misses"] - stats_before["misses"]
+
+    print(f"requests:     {len(latencies)} ({errors} errors)")
+    print(f"requests/sec: {len(latencies) / args.duration:.1f}")
+    if latencies:
+        print(f"latency p50:  {latencies[len(latencies) // 2] * 1000:.1f} ms")
+        print(f"latency p99:  {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+    print(f"cache hit rate: {hits / lookups if lookups else 0:.2%} ({stats_after['entries']} entries, {stats_after['bytes']} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""
+Read-only HTTP API over the scraped corpus for downstream services. It uses its own read-only connection pool
+(`POSTGRES_READ_CONNECTION_STRING`, falls back to the main database) and caches rendered responses in process.
+
+Usage:
+    python -m app.api.server --port 8000
+
+Endpoints:
+    GET /cases/<scc_id>[?text=1]                             case, with its page when text=1
+    GET /cases?court=<name>&date=YYYY-MM-DD[&after=<id>&limit=<n>]
+                                                             cases of a court on a day, pass `next_after` of a page as `after`
+    GET /cases/<scc_id>/citations                            citations of a case, ids not stored yet under `pending`
+    GET /stats                                               cache statistics
+
+Responses carry an ETag, requests with a matching If-None-Match get a 304 without a body.
+"""
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from app.api.cache import ResponseCache
+from app.db.blobs.crud import get_blob_text
+from app.db.cases.crud import get_case_by_scc_id, get_cases_by_court_and_date
+from app.db.citations.crud import get_citations_of_case
+from app.db.database import ReadSession
+from app.logger import logger
+
+MAX_PAGE_SIZE = 500
+
+cache = ResponseCache(
+    max_bytes=int(os.getenv("SCC_API_CACHE_BYTES", 256 * 1024 * 1024)),
+    ttl=float(os.getenv("SCC_API_CACHE_TTL", 300)),
+)
+
+
+class NotFound(Exception):
+    pass
+
+
+class BadRequest(Exception):
+    pass
+
+
+def serialize_case(case, with_text: bool = False) -> dict:
+    data = {
+        "id": case.id,
+        "scc_id": case.scc_id,
+        "bench_name": case.bench_name,
+        "court_name": case.court_name,
+        "case_name": case.case_name,
+        "case_no": case.case_no,
+        "date": case.date.isoformat() if case.date else None,
+        "advocates": case.advocates,
+        "citations": case.citations,
+        "citations_completed": case.citations_completed,
+    }
+    if with_text:
+        data["case_text"] = case.raw_case_text if case.raw_case_text is not None \
+            else get_blob_text(case.case_text_hash, session_factory=ReadSession)
+        # get_blob_text answers None on errors too, which must not be cached as a case without a page
+        if data["case_text"] is None and case.case_text_hash:
+            raise RuntimeError(f"page {case.case_text_hash} of case {case.scc_id} could not be read")
+    return data
+
+
+def serialize_citation(citation) -> dict:
+    return {
+        "unique_id": citation.unique_id,
+        "title": citation.title,
+        "type": citation.type,
+        "referenced_case_id": citation.referenced_case_id,
+        "referenced_case_date": citation.referenced_case_date.isoformat() if citation.referenced_case_date else None,
+    }
+
+
+def get_case(scc_id: str, query: dict) -> dict:
+    case = get_case_by_scc_id(scc_id, session_factory=ReadSession)
+    if not case:
+        raise NotFound(f"case {scc_id} not found")
+    return serialize_case(case, with_text=query.get("text") == "1")
+
+
+def get_case_citations(scc_id: str, query: dict) -> dict:
+    case = get_case_by_scc_id(scc_id, session_factory=ReadSession)
+    if not case:
+        raise NotFound(f"case {scc_id} not found")
+    unique_ids = case.citations or []
+    citations = get_citations_of_case(case.id, unique_ids, session_factory=ReadSession)
+    return {
+        "scc_id": scc_id,
+        "citations": [serialize_citation(citations[unique_id]) for unique_id in unique_ids if unique_id in citations],
+        "pending": [unique_id for unique_id in unique_ids if unique_id not in citations],
+    }
+
+
+def list_cases(query: dict) -> dict:
+    try:
+        court_name = query["court"]
+        date = datetime.strptime(query["date"], "%Y-%m-%d").date()
+        after_id = int(query.get("after", 0))
+        limit = min(int(query.get("limit", 100)), MAX_PAGE_SIZE)
+    except (KeyError, ValueError):
+        raise BadRequest("court and date (YYYY-MM-DD) are required, after and limit must be integers")
+    if limit < 1 or after_id < 0:
+        raise BadRequest("limit must be at least 1 and after can't be negative")
+
+    cases = get_cases_by_court_and_date(court_name, date, after_id=after_id, limit=limit, session_factory=ReadSession)
+    return {
+        "cases": [serialize_case(case) for case in cases],
+        "next_after": cases[-1].id if len(cases) == limit else None,
+    }
+
+
+def route(path: str, query: dict) -> dict:
+    parts = [unquote(part) for part in path.strip("/").split("/")]
+
+    if parts == ["cases"]:
+        return list_cases(query)
+    if len(parts) == 2 and parts[0] == "cases":
+        return get_case(parts[1], query)
+    if len(parts) == 3 and parts[0] == "cases" and parts[2] == "citations":
+        return get_case_citations(parts[1], query)
+    raise NotFound(f"no route for {path}")
+
+
+class ReadAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+
+        if url.path == "/stats":
+            self._send(200, json.dumps(cache.stats()).encode("utf-8"))
+            return
+
+        cached = cache.get(self.path)
+        if cached is None:
+            try:
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                body = json.dumps(route(url.path, query)).encode("utf-8")
+            except NotFound as e:
+                self._send(404, json.dumps({"error": str(e)}).encode("utf-8"))
+                return
+            except BadRequest as e:
+                self._send(400, json.dumps({"error": str(e)}).encode("utf-8"))
+                return
+            except Exception as e:
+                logger.error({
+                    "message": "Error serving read API request",
+                    "path": self.path,
+                    "exception": str(e),
+                    "location": "ReadAPIHandler.do_GET",
+                })
+                self._send(500, json.dumps({"error": "internal error"}).encode("utf-8"))
+                return
+
+            cached = (body, f'"{hashlib.sha1(body).hexdigest()}"')
+            cache.set(self.path, body, cached)
+
+        body, etag = cached
+        if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+            self._send(304, b"", etag)
+        else:
+            self._send(200, body, etag)
+
+    def _send(self, status: int, body: bytes, etag: str | None = None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", f"max-age={int(cache.ttl)}")
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read API over the scraped SCC corpus.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), ReadAPIHandler)
+    logger.info(f"Read API listening on {args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
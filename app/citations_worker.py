@@ -0,0 +1,121 @@
+"""
+Drains the `scc_citations_queue` filled by the court crawl. Any number of workers can run side by side,
+tasks are claimed with SKIP LOCKED and retried with a backoff on errors.
+
+Usage:
+    python -m app.citations_worker --batch-size 50 --threads 10
+"""
+import argparse
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from app.db.citations_queue.crud import claim_citation_tasks, complete_citation_tasks, retry_citation_task, defer_citation_task
+from app.logger import logger
+from app.scrape.authentication import get_aspxauth, periodically_update_aspxauth
+from app.scrape.citations import CitationsAPI
+from app.scrape.scheduler import CrawlScheduler
+
+
+class CitationsWorker:
+    def __init__(
+        self,
+        aspxauth_container: dict,
+        batch_size: int,
+        threads: int,
+        max_attempts: int,
+        stale_after: int,
+        precedent_grace: timedelta = timedelta(days=7),
+    ):
+        self.aspxauth_container = aspxauth_container
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.stale_after = stale_after
+        self.citation_api = CitationsAPI(precedent_grace=precedent_grace)
+        self.scheduler = CrawlScheduler({"citation": threads})
+
+    def run(self, poll_interval: float = 5):
+        while True:
+            if not self.run_once():
+                time.sleep(poll_interval)
+
+    def run_once(self) -> int:
+        tasks = claim_citation_tasks(self.batch_size, stale_after=self.stale_after)
+        if not tasks:
+            return 0
+
+        # Citations of one case go together so its precedents are resolved with a single query
+        tasks_by_case = defaultdict(list)
+        for task in tasks:
+            tasks_by_case[task["case_id"]].append(task)
+
+        # Citations of the newest cases first
+        for case_id, case_tasks in tasks_by_case.items():
+            self.scheduler.submit("citation", (-case_tasks[0]["case_date"].toordinal(),), self._process_case_tasks, (case_id, case_tasks))
+        self.scheduler.join()
+        return len(tasks)
+
+    def _process_case_tasks(self, case_tasks: tuple[int, list[dict]]):
+        case_id, tasks = case_tasks
+        try:
+            failed, waiting = self.citation_api.process_citations(
+                self.aspxauth_container,
+                [task["citation_id"] for task in tasks],
+                case_id,
+            )
+        except Exception as e:
+            logger.error({
+                "message": "Error processing citations, retrying later",
+                "case_id": case_id,
+                "exception": str(e),
+                "location": "CitationsWorker._process_case_tasks",
+            })
+            for task in tasks:
+                retry_citation_task(task, str(e), self.max_attempts)
+            return
+
+        # Only citations that were actually stored count as done, a case is completed once all of its are.
+        # Precedents waiting for the court crawl come back when it stored them or their grace period ran out
+        done = []
+        for task in tasks:
+            if task["citation_id"] in failed:
+                retry_citation_task(task, "Failed to fetch or store citation", self.max_attempts)
+            elif task["citation_id"] in waiting:
+                defer_citation_task(task, waiting[task["citation_id"]])
+            else:
+                done.append(task)
+        complete_citation_tasks(done)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process queued case citations.")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=10)
+    parser.add_argument("--max-attempts", type=int, default=5)
+    parser.add_argument("--stale-after", type=int, default=600, help="Seconds before an unfinished claim is retaken")
+    parser.add_argument(
+        "--precedent-grace-days", type=float, default=7,
+        help="Days a precedent waits for the court crawl before it is downloaded directly",
+    )
+    args = parser.parse_args()
+
+    aspxauth_container = {"ASPXAUTH": get_aspxauth()}
+
+    update_aspxauth_thread = threading.Thread(target=periodically_update_aspxauth, args=(30, aspxauth_container))
+    update_aspxauth_thread.daemon = True
+    update_aspxauth_thread.start()
+
+    worker = CitationsWorker(
+        aspxauth_container,
+        batch_size=args.batch_size,
+        threads=args.threads,
+        max_attempts=args.max_attempts,
+        stale_after=args.stale_after,
+        precedent_grace=timedelta(days=args.precedent_grace_days),
+    )
+    worker.run()
+
+
+if __name__ == '__main__':
+    main()
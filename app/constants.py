@@ -1 +1,11 @@
-BASE_URL = "https://www.scconline.com"
\ No newline at end of file
+BASE_URL = "https://www.scconline.com"
+
+# (connect, read) timeouts in seconds of every SCC endpoint we call
+REQUEST_TIMEOUTS = {
+    "SearchBrowseTree": (5, 60),
+    "SearchRelativePath": (5, 30),
+    "SearchForCitaView": (5, 30),
+    "GetPageData": (5, 120),
+    "Login": (10, 30),
+}
+DEFAULT_REQUEST_TIMEOUT = (5, 60)
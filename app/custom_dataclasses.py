@@ -1,10 +1,18 @@
+import sys
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True)
 class Court:
     key: str
     level: str
 
+    def __post_init__(self):
+        # Millions of nodes share a handful of levels and repeat the same keys (years, months, court names)
+        if self.key is not None:
+            self.key = sys.intern(self.key)
+        if self.level is not None:
+            self.level = sys.intern(self.level)
+
     def key_formatted(self) -> str:
-        return self.key.split("$")[0]
\ No newline at end of file
+        return self.key.split("$")[0]
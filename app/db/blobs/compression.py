@@ -0,0 +1,52 @@
+import hashlib
+import os
+import threading
+
+import zstandard
+
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", 10))
+
+_dictionaries: dict[int, zstandard.ZstdCompressionDict] = {}
+# zstandard (de)compressors must not be used by several threads at once
+_local = threading.local()
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def register_dictionary(dictionary_id: int, data: bytes):
+    _dictionaries[dictionary_id] = zstandard.ZstdCompressionDict(data)
+
+
+def has_dictionary(dictionary_id: int) -> bool:
+    return dictionary_id in _dictionaries
+
+
+def train_dictionary(samples: list[str], size: int = 112640) -> tuple[int, bytes]:
+    dictionary = zstandard.train_dictionary(size, [sample.encode("utf-8") for sample in samples])
+    return dictionary.dict_id(), dictionary.as_bytes()
+
+
+def _get_compressor(dictionary_id: int | None) -> zstandard.ZstdCompressor:
+    compressors = _local.__dict__.setdefault("compressors", {})
+    if dictionary_id not in compressors:
+        dictionary = _dictionaries.get(dictionary_id) if dictionary_id else None
+        compressors[dictionary_id] = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dictionary)
+    return compressors[dictionary_id]
+
+
+def _get_decompressor(dictionary_id: int | None) -> zstandard.ZstdDecompressor:
+    decompressors = _local.__dict__.setdefault("decompressors", {})
+    if dictionary_id not in decompressors:
+        dictionary = _dictionaries[dictionary_id] if dictionary_id else None
+        decompressors[dictionary_id] = zstandard.ZstdDecompressor(dict_data=dictionary)
+    return decompressors[dictionary_id]
+
+
+def compress(text: str, dictionary_id: int | None = None) -> bytes:
+    return _get_compressor(dictionary_id).compress(text.encode("utf-8"))
+
+
+def decompress(data: bytes, dictionary_id: int | None = None) -> str:
+    return _get_decompressor(dictionary_id).decompress(data).decode("utf-8")
@@ -0,0 +1,121 @@
+import threading
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db.blobs import compression
+from app.db.blobs.model import Blob, BlobDictionary
+from app.db.database import Session
+from app.logger import logger
+
+_active_dictionary = {"loaded": False, "id": None}
+_dictionary_lock = threading.Lock()
+
+
+def _load_dictionary(session, dictionary_id: int):
+    with _dictionary_lock:
+        if compression.has_dictionary(dictionary_id):
+            return
+        dictionary = session.get(BlobDictionary, dictionary_id)
+        if not dictionary:
+            raise LookupError(f"Compression dictionary {dictionary_id} not found")
+        compression.register_dictionary(dictionary.id, dictionary.data)
+
+
+def get_active_dictionary_id(session) -> int | None:
+    """
+    The most recently trained dictionary is used for new blobs, it's looked up once per process.
+    """
+    if not _active_dictionary["loaded"]:
+        dictionary_id = session.execute(
+            select(BlobDictionary.id).order_by(BlobDictionary.created_at.desc()).limit(1)
+        ).scalar()
+        if dictionary_id is not None:
+            _load_dictionary(session, dictionary_id)
+        _active_dictionary.update(loaded=True, id=dictionary_id)
+
+    return _active_dictionary["id"]
+
+
+def put_blobs(session, texts: list[str | None]) -> list[str | None]:
+    """
+    Stores `texts` inside the caller's session (so they commit together with the rows referencing them)
+    and returns their hashes in the same order. Bodies that are already stored are neither compressed nor sent again.
+    """
+    hashes = [compression.hash_text(text) if text is not None else None for text in texts]
+    new_blobs = {blob_hash: text for blob_hash, text in zip(hashes, texts) if blob_hash}
+    if not new_blobs:
+        return hashes
+
+    existing = session.execute(select(Blob.hash).where(Blob.hash.in_(list(new_blobs)))).scalars()
+    for blob_hash in existing:
+        new_blobs.pop(blob_hash)
+
+    if new_blobs:
+        dictionary_id = get_active_dictionary_id(session)
+        session.execute(
+            insert(Blob).on_conflict_do_nothing(index_elements=["hash"]),
+            [
+                {
+                    "hash": blob_hash,
+                    "data": compression.compress(text, dictionary_id),
+                    "size": len(text.encode("utf-8")),
+                    "dictionary_id": dictionary_id,
+                }
+                for blob_hash, text in new_blobs.items()
+            ],
+        )
+    return hashes
+
+
+def put_blob(session, text: str | None) -> str | None:
+    return put_blobs(session, [text])[0]
+
+
+def decompress_blob(session, data: bytes, dictionary_id: int | None) -> str:
+    if dictionary_id and not compression.has_dictionary(dictionary_id):
+        _load_dictionary(session, dictionary_id)
+    return compression.decompress(data, dictionary_id)
+
+
+def get_blob_texts(hashes: list[str], session_factory=Session) -> dict[str, str]:
+    hashes = [blob_hash for blob_hash in set(hashes) if blob_hash]
+    if not hashes:
+        return {}
+
+    with session_factory() as session:
+        try:
+            blobs = session.execute(
+                select(Blob.hash, Blob.data, Blob.dictionary_id).where(Blob.hash.in_(hashes))
+            ).all()
+            return {blob.hash: decompress_blob(session, blob.data, blob.dictionary_id) for blob in blobs}
+
+        except Exception as e:
+            logger.error({
+                "message": "Failed to get blobs",
+                "error": str(e),
+            })
+            return {}
+
+
+def get_blob_text(blob_hash: str, session_factory=Session) -> str | None:
+    return get_blob_texts([blob_hash], session_factory=session_factory).get(blob_hash)
+
+
+def insert_dictionary(dictionary_id: int, data: bytes):
+    with Session() as session:
+        try:
+            session.execute(
+                insert(BlobDictionary).values(id=dictionary_id, data=data).on_conflict_do_nothing(index_elements=["id"])
+            )
+            session.commit()
+            compression.register_dictionary(dictionary_id, data)
+            _active_dictionary.update(loaded=True, id=dictionary_id)
+            return dictionary_id
+
+        except Exception as e:
+            logger.error({
+                "message": "Failed to insert compression dictionary",
+                "error": str(e),
+            })
+            session.rollback()
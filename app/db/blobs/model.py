@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, BigInteger, String, LargeBinary, DateTime, func
+
+from app.db.base import Base
+
+
+class Blob(Base):
+    """
+    Content addressed storage for large page bodies, `hash` is the sha256 of the uncompressed text,
+    so the same body stored under different cases or citations is kept only once.
+    """
+    __tablename__ = 'scc_blobs'
+
+    hash = Column(String(64), primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)
+    dictionary_id = Column(BigInteger, nullable=True)
+
+    def __repr__(self):
+        return f"<Blob(hash={self.hash}, size={self.size}, compressed_size={len(self.data or b'')}, dictionary_id={self.dictionary_id})>"
+
+
+class BlobDictionary(Base):
+    __tablename__ = 'scc_blob_dictionaries'
+
+    id = Column(BigInteger, primary_key=True, autoincrement=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<BlobDictionary(id={self.id}, size={len(self.data or b'')}, created_at={self.created_at})>"
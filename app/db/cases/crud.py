@@ -1,16 +1,27 @@
-from datetime import datetime
+from datetime import datetime, date as date_type
 
 import psycopg2
+from sqlalchemy import select, update
 
+from app.db.blobs.crud import put_blob, decompress_blob
+from app.db.blobs.model import Blob
 from app.db.cases.model import Case
+from app.db.citations_queue.crud import enqueue_citations
 from app.db.database import Session
+from app.db.partitions import ensure_year_partition
 from app.logger import logger
 
 
-def get_case_by_scc_id(scc_id: str):
-    with Session() as session:
+def get_case_by_scc_id(scc_id: str, date: date_type | None = None, session_factory=Session):
+    """
+    Pass `date` whenever it's known, it limits the lookup to a single year partition.
+    """
+    with session_factory() as session:
         try:
-            case = session.query(Case).filter_by(scc_id=scc_id).first()
+            query = session.query(Case).filter_by(scc_id=scc_id)
+            if date:
+                query = query.filter(Case.date == date)
+            case = query.first()
             if case:
                 return case
 
@@ -21,6 +32,57 @@ def get_case_by_scc_id(scc_id: str):
             })
 
 
+def get_cases_by_scc_ids(scc_ids: list[str]) -> dict:
+    """
+    Resolves many scc_ids with a single query on the (scc_id, date) unique index.
+    Returns a mapping of scc_id to (id, date).
+    """
+    scc_ids = list({scc_id for scc_id in scc_ids if scc_id})
+    if not scc_ids:
+        return {}
+
+    with Session() as session:
+        try:
+            rows = session.execute(
+                select(Case.scc_id, Case.id, Case.date).where(Case.scc_id.in_(scc_ids))
+            ).all()
+            return {row.scc_id: (row.id, row.date) for row in rows}
+
+        except Exception as e:
+            logger.error({
+                "message": "Failed to get cases by scc_ids",
+                "error": str(e),
+            })
+            return {}
+
+
+def get_cases_by_court_and_date(
+    court_name: str,
+    date: date_type,
+    after_id: int = 0,
+    limit: int = 100,
+    session_factory=Session,
+) -> list[Case]:
+    """
+    Keyset pagination over the cases of a court on a day: pass the last id of a page as `after_id` to get the next one.
+    Errors are raised, an empty list would be cached by the read API as a valid answer.
+    """
+    with session_factory() as session:
+        try:
+            return session.query(Case).filter(
+                Case.court_name == court_name,
+                Case.date == date,
+                Case.id > after_id,
+            ).order_by(Case.id).limit(limit).all()
+
+        except Exception as e:
+            logger.error({
+                "message": "Failed to get cases by court and date",
+                "error": str(e),
+            })
+            raise
+
+
 def get_cases_by_date(date: datetime):
     with Session() as session:
         try:
@@ -48,6 +110,8 @@ def insert_case(
     citations: list[str],
     case_text: str,
 ):
+    ensure_year_partition(Case.__tablename__, date.year)
+
     with Session() as session:
         try:
             existing_case = session.query(Case).filter_by(
@@ -56,7 +120,7 @@ def insert_case(
                 date=date,
             ).first()
             if existing_case:
-                return existing_case
+                return existing_case.id
 
             case = Case(
                 bench_name=bench_name,
@@ -66,11 +130,14 @@ def insert_case(
                 date=date,
                 advocates=advocates,
                 citations=citations,
-                case_text=case_text,
+                case_text_hash=put_blob(session, case_text),
                 scc_id=scc_id,
+                citations_completed=not citations,
             )
 
             session.add(case)
+            session.flush()
+            enqueue_citations(session, case.id, date, citations)
             session.commit()
 
             return case.id
@@ -81,3 +148,79 @@ def insert_case(
                 "error": str(e),
             })
             session.rollback()
+
+
+def iter_cases_for_reparse(
+    start_id: int = 0,
+    end_id: int | None = None,
+    court_name: str | None = None,
+    date_from: date_type | None = None,
+    date_to: date_type | None = None,
+    batch_size: int = 1000,
+):
+    """
+    Streams cases ordered by id in batches of `batch_size` rows through a server-side cursor,
+    so the whole table is never materialized in memory. Yields lists of plain dicts,
+    with the page already decompressed under `case_text`.
+    """
+    query = select(
+        Case.id,
+        Case.date,
+        Case.scc_id,
+        Case.bench_name,
+        Case.case_no,
+        Case.advocates,
+        Case.citations,
+        Case.citations_completed,
+        Case.raw_case_text.label("raw_case_text"),
+        Blob.data.label("case_text_data"),
+        Blob.dictionary_id.label("case_text_dictionary_id"),
+    ).outerjoin(Blob, Blob.hash == Case.case_text_hash).where(Case.id >= start_id)
+
+    if end_id is not None:
+        query = query.where(Case.id <= end_id)
+    if court_name:
+        query = query.where(Case.court_name == court_name)
+    if date_from:
+        query = query.where(Case.date >= date_from)
+    if date_to:
+        query = query.where(Case.date <= date_to)
+
+    query = query.order_by(Case.id).execution_options(yield_per=batch_size)
+
+    with Session() as session:
+        result = session.execute(query)
+        for partition in result.partitions():
+            rows = []
+            for row in partition:
+                row = row._asdict()
+                data, dictionary_id = row.pop("case_text_data"), row.pop("case_text_dictionary_id")
+                raw_case_text = row.pop("raw_case_text")
+                row["case_text"] = raw_case_text if data is None else decompress_blob(session, data, dictionary_id)
+                rows.append(row)
+            yield rows
+
+
+def update_cases(values: list[dict], new_citations: list[dict] | None = None) -> bool:
+    """
+    Bulk UPDATE by primary key, every dict must contain `id`, `date` and the same set of columns.
+    `new_citations` (`case_id`, `case_date`, `citation_ids`) are queued in the same transaction.
+    """
+    if not values:
+        return True
+
+    with Session() as session:
+        try:
+            session.execute(update(Case), values)
+            for citations in new_citations or []:
+                enqueue_citations(session, citations["case_id"], citations["case_date"], citations["citation_ids"])
+            session.commit()
+            return True
+
+        except Exception as e:
+            logger.error({
+                "message": "Failed to update cases",
+                "error": str(e),
+            })
+            session.rollback()
+            return False
@@ -1,25 +1,48 @@
-from sqlalchemy import Column, Integer, String, Text, Date, ARRAY, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Text, Date, Boolean, ARRAY, UniqueConstraint, ForeignKey, Index
 
 from app.db.base import Base
+from app.db.blobs.model import Blob
 
 
 class Case(Base):
+    """
+    `scc_cases` is range partitioned by year of `date` (see `app.db.partitions`), so the partition key
+    has to be part of the primary key and of every unique constraint.
+    """
     __tablename__ = 'scc_cases'
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    scc_id = Column(String, unique=True, nullable=False)
+    scc_id = Column(String, nullable=False)
     bench_name = Column(Text, nullable=True)
     court_name = Column(Text, nullable=True)
     case_name = Column(Text, nullable=True)
     case_no = Column(Text, nullable=True)
-    date = Column(Date, nullable=True)
+    date = Column(Date, primary_key=True)
     advocates = Column(ARRAY(Text), nullable=True)
     citations = Column(ARRAY(Text), nullable=True)
-    case_text = Column(Text, nullable=True)
+    # Rows stored before the blob store keep their page inline until `app.db.migrations.blobs` moves it
+    raw_case_text = Column('case_text', Text, nullable=True)
+    case_text_hash = Column(String(64), ForeignKey(Blob.hash), nullable=True)
+    # Set by the citations worker once every citation queued for the case is done
+    citations_completed = Column(Boolean, nullable=False, default=False)
 
     __table_args__ = (
         UniqueConstraint('case_name', 'court_name', 'date', name='uix_scc_case_court_date'),
+        UniqueConstraint('scc_id', 'date', name='uix_scc_case_scc_id_date'),
+        Index('ix_scc_cases_court_name_date_id', 'court_name', 'date', 'id'),
+        {'postgresql_partition_by': 'RANGE (date)'},
     )
 
+    @property
+    def case_text(self) -> str | None:
+        """
+        The case page, decompressed from the blob store on access.
+        """
+        if self.raw_case_text is not None:
+            return self.raw_case_text
+        if self.case_text_hash:
+            from app.db.blobs.crud import get_blob_text
+            return get_blob_text(self.case_text_hash)
+
     def __repr__(self):
-        return f"<Cases(scc_id={self.scc_id}, bench_name={self.bench_name}, court_name={self.court_name}, case_name={self.case_name}, case_no={self.case_no}, date={self.date}, advocates={self.advocates}, citations={self.citations}, case_text={self.case_text})>"
+        return f"<Cases(scc_id={self.scc_id}, bench_name={self.bench_name}, court_name={self.court_name}, case_name={self.case_name}, case_no={self.case_no}, date={self.date}, advocates={self.advocates}, citations={self.citations}, case_text_hash={self.case_text_hash})>"
@@ -1,10 +1,44 @@
 import psycopg2
+from sqlalchemy import update, func
+from sqlalchemy.dialects.postgresql import insert
 
+from app.db.blobs.crud import put_blob
 from app.db.citations.model import Citation
+from app.db.citations_queue.model import CitationTask
 from app.db.database import Session
+from app.db.precedents.crud import pop_pending_precedents
 from app.logger import logger
 
 
+def get_citations_of_case(case_id: int, unique_ids: list[str], session_factory=Session) -> dict[str, Citation]:
+    """
+    Resolves the citations listed by a case (`scc_cases.citations`). Statutes are shared by every citing case,
+    precedents have a row per citing case and only the one of `case_id` counts. Ids without a row are missing
+    from the result. Errors are raised, a partial answer would be cached by the read API as a valid one.
+    """
+    if not unique_ids:
+        return {}
+
+    with session_factory() as session:
+        try:
+            citations = session.query(Citation).filter(Citation.unique_id.in_(set(unique_ids))).order_by(Citation.id).all()
+
+        except Exception as e:
+            logger.error({
+                "message": "Failed to get citations of case",
+                "error": str(e),
+            })
+            raise
+
+    resolved = {}
+    for citation in citations:
+        if citation.type == 'STATUE' or citation.case_id == case_id:
+            # Prefer the row of the case itself over a statute stored under another case
+            if citation.unique_id not in resolved or citation.case_id == case_id:
+                resolved[citation.unique_id] = citation
+    return resolved
+
+
 def insert_citation(
     unique_id: str,
     case_id: int,
@@ -14,7 +48,11 @@ def insert_citation(
 ):
     with Session() as session:
         try:
-            exsting_citation = session.query(Citation).filter_by(unique_id=unique_id).first()
+            # Statutes are shared by every citing case, precedents have a row per citing case
+            query = session.query(Citation).filter_by(unique_id=unique_id)
+            if type != 'STATUE':
+                query = query.filter_by(case_id=case_id)
+            exsting_citation = query.first()
             if exsting_citation:
                 return exsting_citation
 
@@ -22,7 +60,7 @@ def insert_citation(
                 unique_id=unique_id,
                 case_id=case_id,
                 title=title,
-                text=text,
+                text_hash=put_blob(session, text),
                 type=type,
             )
 
@@ -37,3 +75,78 @@ def insert_citation(
                 "error": str(e),
             })
             session.rollback()
+
+
+def insert_citation_references(references: list[dict]) -> bool:
+    """
+    Stores precedents as references to cases already in `scc_cases`, each dict holds
+    `unique_id`, `case_id`, `referenced_case_id` and `referenced_case_date`. Returns False if nothing was written.
+    """
+    if not references:
+        return True
+
+    with Session() as session:
+        try:
+            session.execute(
+                insert(Citation).on_conflict_do_nothing(constraint='uix_scc_cases_citations_unique_id_case_id'),
+                [{**reference, "type": "PRECEDENT"} for reference in references],
+            )
+            session.commit()
+            return True
+
+        except Exception as e:
+            logger.error({
+                "message": "Failed to insert citation references",
+                "error": str(e),
+            })
+            session.rollback()
+            return False
+
+
+def link_pending_precedents(scc_id: str, case_id: int, case_date):
+    """
+    Called when the court crawl stores a case, resolves the citations that were waiting for it.
+    """
+    with Session() as session:
+        try:
+            citing_case_ids = pop_pending_precedents(session, scc_id)
+            if citing_case_ids:
+                statement = insert(Citation)
+                session.execute(
+                    statement.on_conflict_do_update(
+                        constraint='uix_scc_cases_citations_unique_id_case_id',
+                        set_={
+                            "referenced_case_id": statement.excluded.referenced_case_id,
+                            "referenced_case_date": statement.excluded.referenced_case_date,
+                        },
+                    ),
+                    [
+                        {
+                            "unique_id": scc_id,
+                            "case_id": citing_case_id,
+                            "type": "PRECEDENT",
+                            "referenced_case_id": case_id,
+                            "referenced_case_date": case_date,
+                        }
+                        for citing_case_id in citing_case_ids
+                    ],
+                )
+                # The queue tasks waiting for this precedent can complete right away
+                session.execute(
+                    update(CitationTask)
+                    .where(
+                        CitationTask.citation_id == scc_id,
+                        CitationTask.case_id.in_(citing_case_ids),
+                        CitationTask.status == 'pending',
+                    )
+                    .values(next_attempt_at=func.now())
+                )
+            session.commit()
+            return citing_case_ids
+
+        except Exception as e:
+            logger.error({
+                "message": "Failed to link pending precedents",
+                "error": str(e),
+            })
+            session.rollback()
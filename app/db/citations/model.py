@@ -1,18 +1,41 @@
-from sqlalchemy import Column, Integer, Text, String, ForeignKey
+from sqlalchemy import Column, Integer, Text, String, Date, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
+from app.db.blobs.model import Blob
 
 
 class Citation(Base):
     __tablename__ = 'scc_cases_citations'
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    unique_id = Column(String, unique=True)
-    case_id = Column(Integer, ForeignKey('scc_cases.id'))
+    unique_id = Column(String, index=True)
+    # No foreign key, `scc_cases.id` alone is not unique on the partitioned table
+    case_id = Column(Integer, index=True)
     title = Column(Text)
-    text = Column(Text)
+    # Rows stored before the blob store keep their text inline until `app.db.migrations.blobs` moves it
+    raw_text = Column('text', Text)
+    text_hash = Column(String(64), ForeignKey(Blob.hash), nullable=True)
     type = Column(Text)
+    # Precedents already stored by the court crawl are referenced instead of being downloaded again
+    referenced_case_id = Column(Integer, nullable=True, index=True)
+    referenced_case_date = Column(Date, nullable=True)
+
+    # A precedent gets one row per citing case
+    __table_args__ = (
+        UniqueConstraint('unique_id', 'case_id', name='uix_scc_cases_citations_unique_id_case_id'),
+    )
+
+    @property
+    def text(self) -> str | None:
+        """
+        The citation page, decompressed from the blob store on access.
+        """
+        if self.raw_text is not None:
+            return self.raw_text
+        if self.text_hash:
+            from app.db.blobs.crud import get_blob_text
+            return get_blob_text(self.text_hash)
 
     def __repr__(self):
-        return f"<Citation(unique_id={self.unique_id}, title={self.title}, text={self.text}, type={self.type})>"
+        return f"<Citation(unique_id={self.unique_id}, title={self.title}, text_hash={self.text_hash}, type={self.type}, referenced_case_id={self.referenced_case_id})>"
@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, exists, and_, or_
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db.cases.model import Case
+from app.db.citations_queue.model import CitationTask
+from app.db.database import Session
+from app.logger import logger
+
+
+def enqueue_citations(session, case_id: int, case_date, citation_ids: list[str]):
+    """
+    Queues the citations of a case inside the caller's session, so they commit together with the case.
+    """
+    if not citation_ids:
+        return
+
+    session.execute(
+        insert(CitationTask).on_conflict_do_nothing(constraint='uix_scc_citations_queue_case_citation'),
+        [
+            {"case_id": case_id, "case_date": case_date, "citation_id": citation_id, "status": "pending"}
+            for citation_id in citation_ids
+        ],
+    )
+
+
+def claim_citation_tasks(limit: int, stale_after: int = 600) -> list[dict]:
+    """
+    Claims up to `limit` due tasks for this worker, citations of the newest cases first. SKIP LOCKED lets
+    several workers claim concurrently without waiting on each other, tasks left in processing for
+    `stale_after` seconds (a worker died) are claimed again.
+    """
+    now = datetime.now()
+    claimable = (
+        select(CitationTask.id)
+        .where(or_(
+            and_(CitationTask.status == 'pending', CitationTask.next_attempt_at <= now),
+            and_(CitationTask.status == 'processing', CitationTask.claimed_at < now - timedelta(seconds=stale_after)),
+        ))
+        .order_by(CitationTask.case_date.desc(), CitationTask.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+
+    with Session() as session:
+        try:
+            rows = session.execute(
+                update(CitationTask)
+                .where(CitationTask.id.in_(claimable.scalar_subquery()))
+                .values(status='processing', claimed_at=now, attempts=CitationTask.attempts + 1)
+                .returning(
+                    CitationTask.id,
+                    CitationTask.case_id,
+                    CitationTask.case_date,
+                    CitationTask.citation_id,
+                    CitationTask.attempts,
+                )
+            ).all()
+            session.commit()
+            return [row._asdict() for row in rows]
+
+        except Exception as e:
+            logger.error({
+                "message": "Failed to claim citation tasks",
+                "error": str(e),
+            })
+            session.rollback()
+            return []
+
+
+def complete_citation_tasks(tasks: list[dict]):
+    """
+    Marks the tasks done, then every case of theirs with no unfinished citation left as completed.
+    """
+    if not tasks:
+        return
+
+    with Session() as session:
+        try:
+            session.execute(
+                update(CitationTask)
+                .where(CitationTask.id.in_([task["id"] for task in tasks]))
+                .values(status='done', last_error=None)
+            )
+
+            for case_id, case_date in {(task["case_id"], task["case_date"]) for task in tasks}:
+                unfinished = exists().where(CitationTask.case_id == case_id, CitationTask.status != 'done')
+                session.execute(
+                    update(Case)
+                    .where(Case.id == case_id, Case.date == case_date, ~unfinished)
+                    .values(citations_completed=True)
+                )
+
+            session.commit()
+
+        except Exception as e:
+            logger.error({
+                "message": "Failed to complete citation tasks",
+                "error": str(e),
+            })
+            session.rollback()
+
+
+def retry_citation_task(task: dict, error: str, max_attempts: int, backoff: int = 60):
+    """
+    Puts the task back with an exponential backoff, or marks it failed after `max_attempts`.
+    """
+    failed = task["attempts"] >= max_attempts
+    with Session() as session:
+        try:
+            session.execute(
+                update(CitationTask)
+                .where(CitationTask.id == task["id"])
+                .values(
+                    status='failed' if failed else 'pending',
+                    next_attempt_at=datetime.now() + timedelta(seconds=backoff * 2 ** (task["attempts"] - 1)),
+                    last_error=error,
+                )
+            )
+            session.commit()
+
+        except Exception as e:
+            logger.error({
+                "message": "Failed to retry citation task",
+                "error": str(e),
+            })
+            session.rollback()
+
+
+
+def defer_citation_task(task: dict, until: datetime):
+    """
+    Puts the task back until `until` without counting the attempt, e.g. a precedent waiting for the court crawl.
+    """
+    with Session() as session:
+        try:
+            session.execute(
+                update(CitationTask)
+                .where(CitationTask.id == task["id"])
+                .values(status='pending', next_attempt_at=until, attempts=CitationTask.attempts - 1)
+            )
+            session.commit()
+
+        except Exception as e:
+            logger.error({
+                "message": "Failed to defer citation task",
+                "error": str(e),
+            })
+            session.rollback()
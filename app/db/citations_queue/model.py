@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, UniqueConstraint, Index, func
+
+from app.db.base import Base
+
+
+class CitationTask(Base):
+    """
+    A citation of a stored case that still has to be processed, drained by `app.citations_worker`.
+    Status goes pending -> processing -> done, or back to pending (with a backoff) on error until it's failed.
+    """
+    __tablename__ = 'scc_citations_queue'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    case_id = Column(Integer, nullable=False)
+    case_date = Column(Date, nullable=False)
+    citation_id = Column(String, nullable=False)
+    status = Column(String(16), nullable=False, default='pending')
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, server_default=func.now())
+    claimed_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('case_id', 'citation_id', name='uix_scc_citations_queue_case_citation'),
+        Index('ix_scc_citations_queue_status_next_attempt', 'status', 'next_attempt_at'),
+        # Claims walk open tasks newest case first, see `claim_citation_tasks`
+        Index(
+            'ix_scc_citations_queue_open_case_date',
+            case_date.desc(), id,
+            postgresql_where=status.in_(['pending', 'processing']),
+        ),
+    )
+
+    def __repr__(self):
+        return f"<CitationTask(id={self.id}, case_id={self.case_id}, citation_id={self.citation_id}, " \
+               f"status={self.status}, attempts={self.attempts})>"
@@ -11,4 +11,17 @@ DATABASE_URL = os.getenv("POSTGRES_CONNECTION_STRING")
 
 engine = create_engine(DATABASE_URL)
 Session = sessionmaker(bind=engine)
-Base.metadata.create_all(engine)
\ No newline at end of file
+Base.metadata.create_all(engine)
+
+# Separate pool (optionally on a replica) for read-only consumers such as `app.api`,
+# so they never compete with the scraper's writes for connections
+READ_DATABASE_URL = os.getenv("POSTGRES_READ_CONNECTION_STRING") or DATABASE_URL
+
+read_engine = create_engine(
+    READ_DATABASE_URL,
+    pool_size=int(os.getenv("POSTGRES_READ_POOL_SIZE", 10)),
+    max_overflow=int(os.getenv("POSTGRES_READ_MAX_OVERFLOW", 10)),
+    pool_pre_ping=True,
+    execution_options={"postgresql_readonly": True},
+)
+ReadSession = sessionmaker(bind=read_engine)
@@ -0,0 +1,120 @@
+from sqlalchemy import select, update, tuple_, func
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db.duplicates.model import CaseSignature, CaseBand, DuplicateCase
+
+# Serializes cluster merges across threads and processes, see `record_duplicate_pairs`
+CLUSTER_LOCK_KEY = 0x5CC0D0F
+
+
+def upsert_case_signatures(session, signatures: list[dict], bands: list[dict]):
+    """
+    Stores signatures (`case_id`, `case_date`, `signature`) and their bands (`band`, `band_hash`, `case_id`)
+    inside the caller's session. Reindexing a case replaces its bands.
+    """
+    if not signatures:
+        return
+
+    case_ids = [signature["case_id"] for signature in signatures]
+    session.query(CaseBand).filter(CaseBand.case_id.in_(case_ids)).delete(synchronize_session=False)
+
+    statement = insert(CaseSignature)
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=["case_id"],
+            set_={"signature": statement.excluded.signature, "case_date": statement.excluded.case_date},
+        ),
+        signatures,
+    )
+    session.execute(insert(CaseBand).on_conflict_do_nothing(), bands)
+
+
+def get_band_matches(session, bands: list[tuple[int, int]]) -> list[tuple[int, int, int]]:
+    """
+    Returns the (band, band_hash, case_id) rows of the index matching any of `bands`.
+    """
+    if not bands:
+        return []
+
+    rows = session.execute(
+        select(CaseBand.band, CaseBand.band_hash, CaseBand.case_id)
+        .where(tuple_(CaseBand.band, CaseBand.band_hash).in_(list(set(bands))))
+    ).all()
+    return [tuple(row) for row in rows]
+
+
+def get_signatures(session, case_ids: list[int]) -> dict[int, bytes]:
+    if not case_ids:
+        return {}
+
+    rows = session.execute(
+        select(CaseSignature.case_id, CaseSignature.signature).where(CaseSignature.case_id.in_(list(set(case_ids))))
+    ).all()
+    return {row.case_id: row.signature for row in rows}
+
+
+def record_duplicate_pairs(session, pairs: list[tuple[int, int, float]]):
+    """
+    Merges near-duplicate pairs (case_id, case_id, similarity) into the stored clusters inside the caller's session.
+    Clusters joined by a new pair are merged under the smaller cluster id.
+
+    Merges read and rewrite the membership of whole clusters, so they take a transaction level advisory lock,
+    two concurrent inserts merging the same clusters would otherwise split them. Pairs are rare, the lock is cheap.
+    """
+    if not pairs:
+        return
+
+    session.execute(select(func.pg_advisory_xact_lock(CLUSTER_LOCK_KEY)))
+
+    case_ids = {case_id for pair in pairs for case_id in pair[:2]}
+    existing = dict(session.execute(
+        select(DuplicateCase.case_id, DuplicateCase.cluster_id).where(DuplicateCase.case_id.in_(case_ids))
+    ).all())
+
+    # Union-find over the new pairs, seeded with the clusters the cases already belong to
+    parents = {}
+
+    def find(node):
+        parents.setdefault(node, node)
+        while parents[node] != node:
+            parents[node] = parents[parents[node]]
+            node = parents[node]
+        return node
+
+    def union(a, b):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parents[max(root_a, root_b)] = min(root_a, root_b)
+
+    for case_id, cluster_id in existing.items():
+        union(case_id, cluster_id)
+    best_similarity = {}
+    for case_a, case_b, pair_similarity in pairs:
+        union(case_a, case_b)
+        for case_id in (case_a, case_b):
+            best_similarity[case_id] = max(best_similarity.get(case_id, 0), pair_similarity)
+
+    # Every member of a merged cluster follows it to the new cluster id
+    for old_cluster_id in set(existing.values()):
+        new_cluster_id = find(old_cluster_id)
+        if new_cluster_id != old_cluster_id:
+            session.execute(
+                update(DuplicateCase)
+                .where(DuplicateCase.cluster_id == old_cluster_id)
+                .values(cluster_id=new_cluster_id)
+            )
+
+    statement = insert(DuplicateCase)
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=["case_id"],
+            set_={
+                "cluster_id": statement.excluded.cluster_id,
+                "similarity": func.greatest(DuplicateCase.similarity, statement.excluded.similarity),
+            },
+        ),
+        [
+            {"case_id": case_id, "cluster_id": find(case_id), "similarity": best_similarity[case_id]}
+            for case_id in best_similarity
+        ],
+    )
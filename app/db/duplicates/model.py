@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger, Float, Date, DateTime, LargeBinary, func
+
+from app.db.base import Base
+
+
+class CaseSignature(Base):
+    __tablename__ = 'scc_case_minhash'
+
+    case_id = Column(Integer, primary_key=True, autoincrement=False)
+    case_date = Column(Date, nullable=False)
+    # NUM_PERM little endian uint32 values, see `app.minhash`
+    signature = Column(LargeBinary, nullable=False)
+
+    def __repr__(self):
+        return f"<CaseSignature(case_id={self.case_id}, case_date={self.case_date})>"
+
+
+class CaseBand(Base):
+    """
+    LSH index: cases sharing a (band, band_hash) are near-duplicate candidates. The primary key doubles as the lookup index.
+    """
+    __tablename__ = 'scc_case_lsh_bands'
+
+    band = Column(SmallInteger, primary_key=True)
+    band_hash = Column(BigInteger, primary_key=True)
+    case_id = Column(Integer, primary_key=True)
+
+    def __repr__(self):
+        return f"<CaseBand(band={self.band}, band_hash={self.band_hash}, case_id={self.case_id})>"
+
+
+class DuplicateCase(Base):
+    """
+    Membership of a case in a cluster of near-duplicates, `cluster_id` is the smallest case id of the cluster.
+    """
+    __tablename__ = 'scc_duplicate_cases'
+
+    case_id = Column(Integer, primary_key=True, autoincrement=False)
+    cluster_id = Column(Integer, nullable=False, index=True)
+    similarity = Column(Float, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<DuplicateCase(case_id={self.case_id}, cluster_id={self.cluster_id}, similarity={self.similarity})>"
@@ -0,0 +1,113 @@
+"""
+Moves page bodies stored inline in `scc_cases.case_text` and `scc_cases_citations.text` into the blob store.
+
+Usage:
+    python -m app.db.migrations.blobs --train-dictionary --batch-size 500
+
+The migration works in small committed batches and can be interrupted and rerun at any time.
+Inline columns are only emptied, run `VACUUM FULL scc_cases, scc_cases_citations` afterwards
+to give the space back.
+"""
+import argparse
+
+from sqlalchemy import select, update, text, inspect
+
+from app.db.base import Base
+from app.db.blobs.compression import train_dictionary
+from app.db.blobs.crud import put_blobs, insert_dictionary
+from app.db.cases.model import Case
+from app.db.citations.model import Citation
+from app.db.database import Session, engine
+from app.logger import logger
+
+
+def add_hash_columns():
+    with engine.begin() as connection:
+        connection.execute(text(
+            "ALTER TABLE scc_cases ADD COLUMN IF NOT EXISTS case_text_hash VARCHAR(64) REFERENCES scc_blobs (hash)"
+        ))
+        connection.execute(text(
+            "ALTER TABLE scc_cases_citations ADD COLUMN IF NOT EXISTS text_hash VARCHAR(64) REFERENCES scc_blobs (hash)"
+        ))
+
+
+def train_case_dictionary(samples: int, size: int):
+    """
+    Trains a zstd dictionary on a random sample of stored pages, SCC markup is very repetitive
+    and a shared dictionary helps most with the short bodies (statute sections).
+    """
+    with Session() as session:
+        texts = session.execute(text(
+            "SELECT case_text FROM scc_cases TABLESAMPLE SYSTEM (1) WHERE case_text IS NOT NULL LIMIT :limit"
+        ), {"limit": samples}).scalars().all()
+        texts += session.execute(text(
+            "SELECT text FROM scc_cases_citations TABLESAMPLE SYSTEM (1) WHERE text IS NOT NULL LIMIT :limit"
+        ), {"limit": samples}).scalars().all()
+
+    if not texts:
+        logger.info("No inline pages to train a dictionary on")
+        return
+
+    dictionary_id, data = train_dictionary(texts, size)
+    insert_dictionary(dictionary_id, data)
+    logger.info(f"Trained compression dictionary {dictionary_id} on {len(texts)} samples")
+
+
+def migrate_model(model, text_attribute: str, hash_attribute: str, batch_size: int) -> int:
+    raw_column = getattr(model, text_attribute)
+    # Bulk UPDATEs need the whole primary key, (id, date) for the partitioned cases
+    mapper = inspect(model)
+    primary_key = mapper.primary_key
+    migrated = 0
+
+    while True:
+        with Session() as session:
+            rows = session.execute(
+                select(*primary_key, raw_column.label("text"))
+                .where(raw_column.isnot(None))
+                .order_by(model.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not rows:
+                return migrated
+
+            hashes = put_blobs(session, [row.text for row in rows])
+            session.execute(
+                update(model),
+                [
+                    {
+                        **{mapper.get_property_by_column(column).key: row._mapping[column] for column in primary_key},
+                        hash_attribute: blob_hash,
+                        text_attribute: None,
+                    }
+                    for row, blob_hash in zip(rows, hashes)
+                ],
+            )
+            session.commit()
+
+        migrated += len(rows)
+        logger.info(f"Moved {migrated} {model.__tablename__} bodies into the blob store")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move inline case and citation bodies into the blob store.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--train-dictionary", action="store_true")
+    parser.add_argument("--dictionary-samples", type=int, default=2000)
+    parser.add_argument("--dictionary-size", type=int, default=112640)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    add_hash_columns()
+
+    if args.train_dictionary:
+        train_case_dictionary(args.dictionary_samples, args.dictionary_size)
+
+    cases = migrate_model(Case, "raw_case_text", "case_text_hash", args.batch_size)
+    citations = migrate_model(Citation, "raw_text", "text_hash", args.batch_size)
+    logger.info(f"Blob migration finished: cases={cases}, citations={citations}")
+
+
+if __name__ == '__main__':
+    main()
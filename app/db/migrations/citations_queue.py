@@ -0,0 +1,45 @@
+"""
+Adds `scc_cases.citations_completed` and queues the citations of already stored cases that were never
+processed (they used to live only in memory and were lost on restart).
+
+Usage:
+    python -m app.db.migrations.citations_queue
+"""
+from sqlalchemy import text
+
+from app.db.base import Base
+from app.db.database import engine
+from app.logger import logger
+
+
+def main():
+    Base.metadata.create_all(engine)
+
+    with engine.begin() as connection:
+        connection.execute(text(
+            "ALTER TABLE scc_cases ADD COLUMN IF NOT EXISTS citations_completed BOOLEAN NOT NULL DEFAULT false"
+        ))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_scc_citations_queue_open_case_date "
+            "ON scc_citations_queue (case_date DESC, id) WHERE status IN ('pending', 'processing')"
+        ))
+        queued = connection.execute(text(
+            "INSERT INTO scc_citations_queue (case_id, case_date, citation_id, status, attempts, next_attempt_at) "
+            "SELECT c.id, c.date, u.citation_id, 'pending', 0, now() "
+            "FROM scc_cases AS c CROSS JOIN LATERAL unnest(c.citations) AS u(citation_id) "
+            "WHERE NOT c.citations_completed "
+            "AND NOT EXISTS (SELECT 1 FROM scc_cases_citations AS ci WHERE ci.unique_id = u.citation_id "
+            "AND (ci.type = 'STATUE' OR ci.case_id = c.id)) "
+            "ON CONFLICT ON CONSTRAINT uix_scc_citations_queue_case_citation DO NOTHING"
+        )).rowcount
+        completed = connection.execute(text(
+            "UPDATE scc_cases AS c SET citations_completed = true "
+            "WHERE NOT c.citations_completed "
+            "AND NOT EXISTS (SELECT 1 FROM scc_citations_queue AS q WHERE q.case_id = c.id AND q.status != 'done')"
+        )).rowcount
+
+    logger.info(f"Queued {queued} citations, {completed} cases have all their citations")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+Converts `scc_cases` and `scc_cases_scraped` into tables range partitioned by year and runs
+per-partition maintenance.
+
+Usage:
+    python -m app.db.migrations.partitions migrate [--drop-legacy]
+    python -m app.db.migrations.partitions create --table scc_cases --year 2025
+    python -m app.db.migrations.partitions vacuum --table scc_cases --year 2021
+    python -m app.db.migrations.partitions reindex --table scc_cases --year 2021
+
+`migrate` renames the current heap to `<table>_legacy`, creates the partitioned table in its place and copies
+the rows one year at a time straight into the year partition. The scraper must be stopped while it runs.
+"""
+import argparse
+
+from sqlalchemy import text, inspect
+
+from app.db.base import Base
+from app.db.cases.model import Case
+from app.db.database import engine
+from app.db.partitions import YEAR_PARTITIONED_TABLES, partition_name, partition_bounds, create_year_partition
+from app.db.scraped.model import Scraped
+from app.logger import logger
+
+MODELS = {
+    Case.__tablename__: Case,
+    Scraped.__tablename__: Scraped,
+}
+
+
+def is_partitioned(connection, table: str) -> bool:
+    relkind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE relname = :table AND relkind IN ('r', 'p')"),
+        {"table": table},
+    ).scalar()
+    return relkind == "p"
+
+
+def rename_to_legacy(connection, table: str):
+    legacy = f"{table}_legacy"
+    connection.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+
+    # Index (and so constraint) and sequence names are schema wide, free them for the new table
+    indexes = connection.execute(
+        text("SELECT indexname FROM pg_indexes WHERE tablename = :table"),
+        {"table": legacy},
+    ).scalars().all()
+    for index in indexes:
+        connection.execute(text(f'ALTER INDEX "{index}" RENAME TO "{index}_legacy"'))
+
+    sequence = connection.execute(
+        text("SELECT pg_get_serial_sequence(:table, 'id')"),
+        {"table": legacy},
+    ).scalar()
+    if sequence:
+        connection.execute(text(f"ALTER SEQUENCE {sequence} RENAME TO {legacy}_id_seq"))
+
+
+def count_unpartitioned_rows(table: str) -> int:
+    """
+    Rows of `<table>_legacy` without a partition key, `migrate_table` can't copy them.
+    """
+    with engine.connect() as connection:
+        return connection.execute(
+            text(f"SELECT COUNT(*) FROM {table}_legacy WHERE {YEAR_PARTITIONED_TABLES[table]} IS NULL")
+        ).scalar()
+
+
+def migrate_table(table: str) -> int:
+    model = MODELS[table]
+    key = YEAR_PARTITIONED_TABLES[table]
+    legacy = f"{table}_legacy"
+    year_expression = key if key == "year" else f"EXTRACT(YEAR FROM {key})::int"
+
+    with engine.begin() as connection:
+        if is_partitioned(connection, table):
+            logger.info(f"{table} is already partitioned")
+            return 0
+
+        if table == Case.__tablename__:
+            connection.execute(text(
+                "ALTER TABLE scc_cases_citations DROP CONSTRAINT IF EXISTS scc_cases_citations_case_id_fkey"
+            ))
+        rename_to_legacy(connection, table)
+        model.__table__.create(connection)
+
+        years = connection.execute(text(
+            f"SELECT DISTINCT {year_expression} FROM {legacy} WHERE {key} IS NOT NULL ORDER BY 1"
+        )).scalars().all()
+        for year in years:
+            create_year_partition(connection, table, year)
+
+    legacy_columns = {column["name"] for column in inspect(engine).get_columns(legacy)}
+    columns = ", ".join(column.name for column in model.__table__.columns if column.name in legacy_columns)
+
+    copied = 0
+    for year in years:
+        lower, upper = partition_bounds(table, year)
+        # One transaction per year, and inserting into the partition directly skips tuple routing
+        with engine.begin() as connection:
+            result = connection.execute(text(
+                f"INSERT INTO {partition_name(table, year)} ({columns}) "
+                f"SELECT {columns} FROM {legacy} WHERE {key} >= {lower} AND {key} < {upper}"
+            ))
+        copied += result.rowcount
+        logger.info(f"Copied {result.rowcount} rows of {year} into {partition_name(table, year)}")
+
+    with engine.begin() as connection:
+        connection.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {legacy}), 1))"
+        ))
+
+    skipped = count_unpartitioned_rows(table)
+    if skipped:
+        logger.warning(f"{skipped} rows of {legacy} have no {key} and were not copied")
+
+    return copied
+
+
+def drop_legacy(table: str) -> bool:
+    """
+    Drops `<table>_legacy` unless it still holds rows that weren't copied, those need a partition key first.
+    """
+    with engine.connect() as connection:
+        if not connection.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": f"{table}_legacy"}).scalar():
+            return False
+
+    skipped = count_unpartitioned_rows(table)
+    if skipped:
+        logger.error(
+            f"Not dropping {table}_legacy, {skipped} of its rows have no {YEAR_PARTITIONED_TABLES[table]} "
+            f"and exist nowhere else"
+        )
+        return False
+
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE {table}_legacy"))
+    return True
+
+
+def maintain_partition(command: str, table: str, year: int):
+    # VACUUM can't run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        if command == "vacuum":
+            connection.execute(text(f"VACUUM (ANALYZE) {partition_name(table, year)}"))
+        else:
+            connection.execute(text(f"REINDEX TABLE {partition_name(table, year)}"))
+    logger.info(f"{command} of {partition_name(table, year)} done")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Year partitioning of scc_cases and scc_cases_scraped.")
+    parser.add_argument("command", choices=["migrate", "create", "vacuum", "reindex"])
+    parser.add_argument("--table", choices=list(YEAR_PARTITIONED_TABLES), default=None)
+    parser.add_argument("--year", type=int, default=None)
+    parser.add_argument("--drop-legacy", action="store_true")
+    args = parser.parse_args()
+
+    tables = [args.table] if args.table else list(YEAR_PARTITIONED_TABLES)
+
+    if args.command == "migrate":
+        for table in tables:
+            copied = migrate_table(table)
+            logger.info(f"Partitioned {table}, {copied} rows copied")
+            if args.drop_legacy and drop_legacy(table):
+                logger.info(f"Dropped {table}_legacy")
+        Base.metadata.create_all(engine)
+        return
+
+    if args.year is None:
+        parser.error(f"--year is required for {args.command}")
+
+    for table in tables:
+        if args.command == "create":
+            with engine.begin() as connection:
+                create_year_partition(connection, table, args.year)
+        else:
+            maintain_partition(args.command, table, args.year)
+
+
+if __name__ == '__main__':
+    main()
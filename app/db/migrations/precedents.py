@@ -0,0 +1,54 @@
+"""
+Adds the precedent reference columns to `scc_cases_citations`, makes citations unique per (unique_id, case_id)
+instead of per unique_id, and links precedents downloaded by older versions to the cases the court crawl stored for them.
+
+Usage:
+    python -m app.db.migrations.precedents
+"""
+from sqlalchemy import text
+
+from app.db.base import Base
+from app.db.database import engine
+from app.logger import logger
+
+
+def main():
+    Base.metadata.create_all(engine)
+
+    with engine.begin() as connection:
+        connection.execute(text(
+            "ALTER TABLE scc_cases_citations ADD COLUMN IF NOT EXISTS referenced_case_id INTEGER"
+        ))
+        connection.execute(text(
+            "ALTER TABLE scc_cases_citations ADD COLUMN IF NOT EXISTS referenced_case_date DATE"
+        ))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_scc_cases_citations_referenced_case_id "
+            "ON scc_cases_citations (referenced_case_id)"
+        ))
+        connection.execute(text(
+            "ALTER TABLE scc_cases_citations DROP CONSTRAINT IF EXISTS scc_cases_citations_unique_id_key"
+        ))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_scc_cases_citations_unique_id ON scc_cases_citations (unique_id)"
+        ))
+        has_pair_constraint = connection.execute(text(
+            "SELECT 1 FROM pg_constraint WHERE conname = 'uix_scc_cases_citations_unique_id_case_id'"
+        )).scalar()
+        if not has_pair_constraint:
+            connection.execute(text(
+                "ALTER TABLE scc_cases_citations ADD CONSTRAINT uix_scc_cases_citations_unique_id_case_id "
+                "UNIQUE (unique_id, case_id)"
+            ))
+        result = connection.execute(text(
+            "UPDATE scc_cases_citations AS citation "
+            "SET referenced_case_id = c.id, referenced_case_date = c.date "
+            "FROM scc_cases AS c "
+            "WHERE citation.type = 'PRECEDENT' AND citation.referenced_case_id IS NULL AND c.scc_id = citation.unique_id"
+        ))
+
+    logger.info(f"Linked {result.rowcount} stored precedents to their cases")
+
+
+if __name__ == '__main__':
+    main()
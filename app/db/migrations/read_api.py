@@ -0,0 +1,19 @@
+"""
+Adds the index behind the court/date keyset pagination of `app.api` to an existing `scc_cases`.
+
+Usage:
+    python -m app.db.migrations.read_api
+"""
+from app.db.cases.model import Case
+from app.db.database import engine
+from app.logger import logger
+
+
+def main():
+    for index in Case.__table__.indexes:
+        index.create(engine, checkfirst=True)
+        logger.info(f"Index {index.name} is in place")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import threading
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.db.database import engine
+from app.logger import logger
+
+# Tables partitioned by year and the column holding the partition key
+YEAR_PARTITIONED_TABLES = {
+    "scc_cases": "date",
+    "scc_cases_scraped": "year",
+}
+
+_existing_partitions = set()
+_partitions_lock = threading.Lock()
+
+
+def partition_name(table: str, year: int) -> str:
+    return f"{table}_y{year}"
+
+
+def partition_bounds(table: str, year: int) -> tuple[str, str]:
+    if YEAR_PARTITIONED_TABLES[table] == "year":
+        return str(year), str(year + 1)
+    return f"'{date(year, 1, 1).isoformat()}'", f"'{date(year + 1, 1, 1).isoformat()}'"
+
+
+def create_year_partition(connection, table: str, year: int):
+    lower, upper = partition_bounds(table, year)
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, year)} "
+        f"PARTITION OF {table} FOR VALUES FROM ({lower}) TO ({upper})"
+    ))
+
+
+def partition_exists(connection, table: str, year: int) -> bool:
+    return connection.execute(
+        text("SELECT to_regclass(:name) IS NOT NULL"),
+        {"name": partition_name(table, year)},
+    ).scalar()
+
+
+def ensure_year_partition(table: str, year: int):
+    """
+    Creates the partition of `table` for `year` the first time a row for that year is written by this process.
+    """
+    if (table, year) in _existing_partitions:
+        return
+
+    with _partitions_lock:
+        if (table, year) in _existing_partitions:
+            return
+
+        try:
+            with engine.begin() as connection:
+                create_year_partition(connection, table, year)
+        except DBAPIError as e:
+            # Another process created it between our IF NOT EXISTS check and the CREATE, which surfaces
+            # as a duplicate table or a unique violation on the catalog depending on timing
+            with engine.connect() as connection:
+                if not partition_exists(connection, table, year):
+                    raise
+            logger.warning({
+                "message": "Partition was created concurrently",
+                "table": table,
+                "year": year,
+                "error": str(e),
+            })
+
+        _existing_partitions.add((table, year))
@@ -0,0 +1,79 @@
+from datetime import datetime
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db.database import Session
+from app.db.precedents.model import PendingPrecedent
+from app.logger import logger
+
+
+def insert_pending_precedents(scc_ids: list[str], citing_case_id: int) -> bool:
+    if not scc_ids:
+        return True
+
+    with Session() as session:
+        try:
+            session.execute(
+                insert(PendingPrecedent).on_conflict_do_nothing(
+                    constraint='uix_scc_pending_precedent_citing_case',
+                ),
+                [{"scc_id": scc_id, "citing_case_id": citing_case_id} for scc_id in scc_ids],
+            )
+            session.commit()
+            return True
+
+        except Exception as e:
+            logger.error({
+                "message": "Failed to insert pending precedents",
+                "error": str(e),
+            })
+            session.rollback()
+            return False
+
+
+def pop_pending_precedents(session, scc_id: str) -> list[int]:
+    """
+    Removes the pending precedents for `scc_id` inside the caller's session and returns the citing case ids.
+    """
+    citing_case_ids = session.execute(
+        delete(PendingPrecedent).where(PendingPrecedent.scc_id == scc_id).returning(PendingPrecedent.citing_case_id)
+    ).scalars().all()
+    return list(citing_case_ids)
+
+
+
+def get_pending_precedents(scc_ids: list[str], citing_case_id: int) -> dict[str, datetime]:
+    """
+    Returns when each of the `scc_ids` cited by `citing_case_id` started waiting for the crawl.
+    """
+    if not scc_ids:
+        return {}
+
+    with Session() as session:
+        rows = session.execute(
+            select(PendingPrecedent.scc_id, PendingPrecedent.created_at).where(
+                PendingPrecedent.scc_id.in_(scc_ids),
+                PendingPrecedent.citing_case_id == citing_case_id,
+            )
+        ).all()
+        return {row.scc_id: row.created_at for row in rows}
+
+
+def delete_pending_precedent(scc_id: str, citing_case_id: int):
+    with Session() as session:
+        try:
+            session.execute(
+                delete(PendingPrecedent).where(
+                    PendingPrecedent.scc_id == scc_id,
+                    PendingPrecedent.citing_case_id == citing_case_id,
+                )
+            )
+            session.commit()
+
+        except Exception as e:
+            logger.error({
+                "message": "Failed to delete pending precedent",
+                "error": str(e),
+            })
+            session.rollback()
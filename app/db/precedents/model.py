@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint, func
+
+from app.db.base import Base
+
+
+class PendingPrecedent(Base):
+    """
+    A precedent cited by an already stored case that the court-tree crawl hasn't stored yet.
+    It's linked to the citing case once the crawl saves a case with the same `scc_id`.
+    """
+    __tablename__ = 'scc_pending_precedents'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    scc_id = Column(String, nullable=False, index=True)
+    citing_case_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('scc_id', 'citing_case_id', name='uix_scc_pending_precedent_citing_case'),
+    )
+
+    def __repr__(self):
+        return f"<PendingPrecedent(scc_id={self.scc_id}, citing_case_id={self.citing_case_id}, created_at={self.created_at})>"
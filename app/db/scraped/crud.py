@@ -1,6 +1,8 @@
 import psycopg2.errors
+from sqlalchemy import func
 
 from app.db.database import Session
+from app.db.partitions import ensure_year_partition
 from app.db.scraped.model import Scraped
 from app.logger import logger
 
@@ -13,6 +15,8 @@ def insert_scraped_record(
     day: int,
     completed: bool,
 ):
+    ensure_year_partition(Scraped.__tablename__, year)
+
     with Session() as session:
         try:
             existing_record = session.query(Scraped).filter_by(
@@ -44,4 +48,17 @@ def insert_scraped_record(
                 "message": "Failed to insert scraped record",
                 "error": str(e),
             })
-            session.rollback()
\ No newline at end of file
+            session.rollback()
+
+def count_scraped_days_by_court() -> dict[str, int]:
+    with Session() as session:
+        try:
+            rows = session.query(Scraped.court_name, func.count(Scraped.id)).group_by(Scraped.court_name).all()
+            return {court_name: count for court_name, count in rows}
+
+        except Exception as e:
+            logger.error({
+                "message": "Failed to count scraped days by court",
+                "error": str(e),
+            })
+            return {}
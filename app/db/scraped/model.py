@@ -6,16 +6,18 @@ from app.db.base import Base
 class Scraped(Base):
     __tablename__ = 'scc_cases_scraped'
 
-    id = Column(Integer, primary_key=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     court_type = Column(String(255), nullable=False)
     court_name = Column(String(255), nullable=False)
-    year = Column(Integer, nullable=False)
+    # Partition key, see `app.db.partitions`
+    year = Column(Integer, primary_key=True)
     month = Column(Integer, nullable=False)
     day = Column(Integer, nullable=False)
     completed = Column(Boolean, default=False)
 
     __table_args__ = (
         UniqueConstraint('court_type', 'court_name', 'year', 'month', 'day', name='_court_name_year_month_day_uc'),
+        {'postgresql_partition_by': 'RANGE (year)'},
     )
 
     def __repr__(self):
@@ -0,0 +1,165 @@
+"""
+Near-duplicate detection of judgments stored under several titles or courts, see `app.minhash`.
+New cases are checked when the crawl stores them; this module also indexes the cases already stored:
+
+Usage:
+    python -m app.dedupe --workers 8 --threshold 0.8
+
+Duplicates are recorded as clusters in `scc_duplicate_cases`. The batch job is resumable through its checkpoint.
+"""
+import argparse
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app import minhash
+from app.db.cases.crud import iter_cases_for_reparse
+from app.db.database import Session
+from app.db.duplicates.crud import upsert_case_signatures, get_band_matches, get_signatures, record_duplicate_pairs
+from app.logger import logger
+from app.reparse import load_checkpoint, save_checkpoint, parse_date
+
+
+def index_cases(cases: list[dict], shingle_sets: list[np.ndarray], threshold: float = minhash.DEFAULT_THRESHOLD):
+    """
+    Adds `cases` (dicts with `id` and `date`) to the LSH index and records the near-duplicates found among
+    the indexed cases, this batch included. Returns the (case_id, case_id, similarity) pairs found.
+    """
+    signature_matrix = minhash.signatures(shingle_sets)
+    band_matrix = minhash.band_hashes(signature_matrix)
+    indexed = [i for i in range(len(cases)) if not minhash.is_empty(signature_matrix[i])]
+    if not indexed:
+        return []
+
+    with Session() as session:
+        try:
+            upsert_case_signatures(
+                session,
+                [
+                    {"case_id": cases[i]["id"], "case_date": cases[i]["date"], "signature": minhash.to_bytes(signature_matrix[i])}
+                    for i in indexed
+                ],
+                [
+                    {"band": band, "band_hash": int(band_matrix[i, band]), "case_id": cases[i]["id"]}
+                    for i in indexed for band in range(minhash.BANDS)
+                ],
+            )
+
+            cases_by_band = defaultdict(set)
+            for band, band_hash, case_id in get_band_matches(
+                session, [(band, int(band_matrix[i, band])) for i in indexed for band in range(minhash.BANDS)]
+            ):
+                cases_by_band[(band, band_hash)].add(case_id)
+
+            candidates = {}
+            for i in indexed:
+                case_id = cases[i]["id"]
+                candidates[i] = {
+                    candidate
+                    for band in range(minhash.BANDS)
+                    for candidate in cases_by_band[(band, int(band_matrix[i, band]))]
+                    if candidate != case_id
+                }
+
+            # Candidates only share a band, their full signatures tell the actual similarity
+            stored_signatures = get_signatures(session, [candidate for ids in candidates.values() for candidate in ids])
+            pairs = set()
+            for i, candidate_ids in candidates.items():
+                candidate_ids = [candidate for candidate in candidate_ids if candidate in stored_signatures]
+                if not candidate_ids:
+                    continue
+                others = np.stack([minhash.from_bytes(stored_signatures[candidate]) for candidate in candidate_ids])
+                for candidate, pair_similarity in zip(candidate_ids, minhash.similarity(signature_matrix[i], others)):
+                    if pair_similarity >= threshold:
+                        case_a, case_b = sorted((cases[i]["id"], candidate))
+                        pairs.add((case_a, case_b, float(pair_similarity)))
+
+            record_duplicate_pairs(session, list(pairs))
+            session.commit()
+            return list(pairs)
+
+        except Exception as e:
+            logger.error({
+                "message": "Failed to index cases for duplicates",
+                "error": str(e),
+            })
+            session.rollback()
+            return []
+
+
+def check_case_for_duplicates(case_id: int, case_date, page: str, threshold: float = minhash.DEFAULT_THRESHOLD):
+    _, shingles = minhash.page_shingles(case_id, page)
+    pairs = index_cases([{"id": case_id, "date": case_date}], [shingles], threshold)
+    if pairs:
+        logger.info({
+            "message": "Near-duplicate case stored",
+            "case_id": case_id,
+            "duplicates": [case_b if case_a == case_id else case_a for case_a, case_b, _ in pairs],
+        })
+    return pairs
+
+
+def dedupe(workers: int, batch_size: int, checkpoint: str, threshold: float, court_name=None, date_from=None, date_to=None):
+    start_id = 0
+    last_id = load_checkpoint(checkpoint)
+    if last_id is not None:
+        start_id = last_id + 1
+        logger.info(f"Resuming dedupe from case id {start_id}")
+
+    scanned, duplicates = 0, 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for rows in iter_cases_for_reparse(
+            start_id=start_id,
+            court_name=court_name,
+            date_from=date_from,
+            date_to=date_to,
+            batch_size=batch_size,
+        ):
+            shingles_by_id = dict(executor.map(
+                minhash.page_shingles,
+                [row["id"] for row in rows],
+                [row["case_text"] for row in rows],
+                chunksize=max(1, len(rows) // (workers * 4)),
+            ))
+            pairs = index_cases(rows, [shingles_by_id[row["id"]] for row in rows], threshold)
+
+            scanned += len(rows)
+            duplicates += len(pairs)
+            save_checkpoint(checkpoint, rows[-1]["id"])
+            logger.info({
+                "message": "Dedupe batch done",
+                "last_id": rows[-1]["id"],
+                "scanned": scanned,
+                "duplicate_pairs": duplicates,
+            })
+
+    return scanned, duplicates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index stored cases for near-duplicates.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--checkpoint", default="dedupe_checkpoint.json")
+    parser.add_argument("--threshold", type=float, default=minhash.DEFAULT_THRESHOLD)
+    parser.add_argument("--court", default=None, help="Limit to a court name (Node3)")
+    parser.add_argument("--date-from", type=parse_date, default=None, help="YYYY-MM-DD")
+    parser.add_argument("--date-to", type=parse_date, default=None, help="YYYY-MM-DD")
+    args = parser.parse_args()
+
+    scanned, duplicates = dedupe(
+        workers=args.workers,
+        batch_size=args.batch_size,
+        checkpoint=args.checkpoint,
+        threshold=args.threshold,
+        court_name=args.court,
+        date_from=args.date_from,
+        date_to=args.date_to,
+    )
+    logger.info(f"Dedupe finished: scanned={scanned}, duplicate_pairs={duplicates}")
+
+
+if __name__ == '__main__':
+    main()
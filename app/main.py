@@ -1,3 +1,4 @@
+import os
 import threading
 import time
 
@@ -5,7 +6,9 @@ from app.logger import logger
 from app.db.base import Base
 from app.db.database import engine
 from app.scrape.authentication import get_aspxauth, periodically_update_aspxauth
+from app.db.scraped.crud import count_scraped_days_by_court
 from app.scrape.courts import CourtsAPI
+from app.scrape.scheduler import CrawlPriority
 
 if __name__ == '__main__':
     Base.metadata.create_all(engine)
@@ -19,7 +22,21 @@ if __name__ == '__main__':
     update_aspxauth_thread.daemon = True
     update_aspxauth_thread.start()
 
-    courts_scraper = CourtsAPI()
+    priority_policy = os.getenv("SCC_CRAWL_PRIORITY", "newest")
+    priority = CrawlPriority(
+        policy=priority_policy,
+        courts=[court.strip() for court in os.getenv("SCC_PRIORITY_COURTS", "").split(",") if court.strip()],
+        coverage=count_scraped_days_by_court() if priority_policy == "coverage" else None,
+    )
+
+    courts_scraper = CourtsAPI(
+        tree_index_path=os.getenv("SCC_TREE_INDEX_PATH", "browse_tree.json.gz"),
+        refresh_days=int(os.getenv("SCC_TREE_REFRESH_DAYS", 45)),
+        priority=priority,
+        tree_concurrency=int(os.getenv("SCC_TREE_CONCURRENCY", 20)),
+        leaf_concurrency=int(os.getenv("SCC_LEAF_CONCURRENCY", 80)),
+        batch_xml_paths=os.getenv("SCC_BATCH_XML_PATHS", "false").lower() == "true",
+    )
 
     get_courts_thread = threading.Thread(target=courts_scraper.get_courts_recursively, args=(aspxauth_container,))
     get_courts_thread.daemon = True
@@ -0,0 +1,131 @@
+"""
+MinHash signatures and LSH banding of case pages, used by `app.dedupe` to find near-duplicate judgments.
+
+Pages are reduced to the set of hashed `SHINGLE_SIZE`-word shingles of their text. The MinHash of a page is,
+for each of `NUM_PERM` random hash functions, the minimum hash over its shingles. Two pages agree on a signature
+position with probability equal to their Jaccard similarity. Signatures are cut into `BANDS` bands, pages sharing
+any band hash are candidates, with 16 bands of 8 rows the probability of becoming candidates is ~50%
+at a similarity of 0.7 and >99% above 0.9.
+"""
+import re
+import zlib
+
+import numpy as np
+from bs4 import BeautifulSoup
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.8
+
+_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+_EMPTY = np.iinfo(np.uint32).max
+
+# Multiply-shift hash family, fixed seed so signatures stay comparable across runs and processes
+_random = np.random.default_rng(20240101)
+_A = _random.integers(1, 2 ** 63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _random.integers(0, 2 ** 63, size=NUM_PERM, dtype=np.uint64)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def extract_text(page: str) -> str:
+    return BeautifulSoup(page, "lxml").get_text(" ")
+
+
+def text_shingles(text: str) -> np.ndarray:
+    """
+    Unique hashes of the `SHINGLE_SIZE`-word shingles of `text`, as uint64 holding 32 bit values.
+    """
+    words = np.fromiter(
+        (zlib.crc32(word.encode("utf-8")) for word in _WORD_RE.findall(text.lower())),
+        dtype=np.uint64,
+    )
+    if len(words) < SHINGLE_SIZE:
+        return np.unique(words)
+
+    # Polynomial hash of every window of words, computed for all windows at once (uint64 wraps around)
+    count = len(words) - SHINGLE_SIZE + 1
+    shingles = np.zeros(count, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for offset in range(SHINGLE_SIZE):
+            shingles = shingles * _MULTIPLIER + words[offset:offset + count]
+    return np.unique(shingles >> np.uint64(32))
+
+
+def page_shingles(case_id: int, page: str | None) -> tuple[int, np.ndarray]:
+    """
+    Process pool entry point, parsing pages is the expensive part of indexing.
+    """
+    if not page:
+        return case_id, np.zeros(0, dtype=np.uint64)
+    return case_id, text_shingles(extract_text(page))
+
+
+def signatures(shingle_sets: list[np.ndarray], perm_chunk: int = 16, max_values: int = 1 << 18) -> np.ndarray:
+    """
+    MinHash signatures of many documents at once, shape (documents, NUM_PERM) of uint32.
+    Documents without shingles get a signature of max values, which never matches anything real.
+
+    Intermediate arrays hold `perm_chunk` x `max_values` hashes (32 MB with the defaults), documents are
+    grouped so a group stays under `max_values` shingles, a longer document makes a group of its own.
+    """
+    result = np.full((len(shingle_sets), NUM_PERM), _EMPTY, dtype=np.uint32)
+    non_empty = [i for i, shingles in enumerate(shingle_sets) if len(shingles)]
+
+    group, group_size = [], 0
+    for i in non_empty:
+        if group and group_size + len(shingle_sets[i]) > max_values:
+            _group_signatures(shingle_sets, group, perm_chunk, result)
+            group, group_size = [], 0
+        group.append(i)
+        group_size += len(shingle_sets[i])
+
+    if group:
+        _group_signatures(shingle_sets, group, perm_chunk, result)
+    return result
+
+
+def _group_signatures(shingle_sets: list[np.ndarray], group: list[int], perm_chunk: int, result: np.ndarray):
+    values = np.concatenate([shingle_sets[i] for i in group])
+    offsets = np.cumsum([0] + [len(shingle_sets[i]) for i in group[:-1]])
+
+    # All shingles of the group are hashed with a chunk of permutations at a time to bound memory
+    with np.errstate(over="ignore"):
+        for start in range(0, NUM_PERM, perm_chunk):
+            a = _A[start:start + perm_chunk, None]
+            b = _B[start:start + perm_chunk, None]
+            hashed = ((a * values[None, :] + b) >> np.uint64(32)).astype(np.uint32)
+            result[group, start:start + perm_chunk] = np.minimum.reduceat(hashed, offsets, axis=1).T
+
+
+def band_hashes(signature_matrix: np.ndarray) -> np.ndarray:
+    """
+    One int64 hash per band of every signature, shape (documents, BANDS), ready to be stored as BIGINT.
+    """
+    rows = signature_matrix.reshape(len(signature_matrix), BANDS, ROWS).astype(np.uint64)
+    hashes = np.zeros((len(signature_matrix), BANDS), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for row in range(ROWS):
+            hashes = hashes * _MULTIPLIER + rows[:, :, row]
+    return hashes.view(np.int64)
+
+
+def is_empty(signature: np.ndarray) -> bool:
+    return bool((signature == _EMPTY).all())
+
+
+def similarity(signature: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """
+    Estimated Jaccard similarity of `signature` with every row of `others`.
+    """
+    return (others == signature).mean(axis=1)
+
+
+def to_bytes(signature: np.ndarray) -> bytes:
+    return signature.astype("<u4").tobytes()
+
+
+def from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<u4").astype(np.uint32)
@@ -0,0 +1,185 @@
+"""
+Re-runs the case page parser over the `case_text` already stored in `scc_cases` and writes back the columns
+whose values changed, without refetching anything from SCC.
+
+Usage:
+    python -m app.reparse --workers 8 --court "Supreme Court of India" --date-from 2020-01-01
+
+Progress is stored in the checkpoint file after every committed batch, running the same command again
+resumes after the last committed id.
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from app.db.cases.crud import iter_cases_for_reparse, update_cases
+from app.logger import logger
+from app.scrape.cases import parse_case_page
+
+PARSED_FIELDS = ("scc_id", "bench_name", "case_no", "advocates", "citations")
+
+
+def load_checkpoint(path: str) -> int | None:
+    if not path or not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        return json.load(f).get("last_id")
+
+
+def save_checkpoint(path: str, last_id: int):
+    if not path:
+        return
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"last_id": last_id, "updated_at": datetime.now().isoformat()}, f)
+    os.replace(tmp_path, path)
+
+
+def get_changed_values(row: dict, case_info: dict) -> dict | None:
+    """
+    Compares parsed values with the stored ones and returns the full set of parsed columns for the row
+    if any of them changed. Full sets keep every UPDATE in a batch on the same columns.
+    """
+    values = {field: case_info.get(field) for field in PARSED_FIELDS}
+
+    # scc_id is not nullable, a page we can't read it from keeps the stored one
+    if not values["scc_id"]:
+        values["scc_id"] = row["scc_id"]
+
+    # citations come out of a set, their order is meaningless
+    if values["citations"] is not None:
+        values["citations"] = sorted(values["citations"])
+    stored_citations = sorted(row["citations"]) if row["citations"] is not None else None
+
+    if all(values[field] == row[field] for field in PARSED_FIELDS if field != "citations") \
+            and values["citations"] == stored_citations:
+        return None
+
+    # New citations still have to be fetched by the citations worker, the case isn't complete anymore
+    values["citations_completed"] = row["citations_completed"] and not get_new_citations(row, values)
+
+    # `date` is part of the primary key of the partitioned table
+    values["id"] = row["id"]
+    values["date"] = row["date"]
+    return values
+
+
+def get_new_citations(row: dict, values: dict) -> list[str]:
+    stored = set(row["citations"] or [])
+    return [citation_id for citation_id in values["citations"] or [] if citation_id not in stored]
+
+
+def write_updates(values: list[dict], new_citations: list[dict]) -> int:
+    if update_cases(values, new_citations):
+        return len(values)
+
+    # One conflicting row (e.g. a duplicated scc_id) fails the whole batch, retry row by row to isolate it
+    updated = 0
+    for value in values:
+        if update_cases([value], [citations for citations in new_citations if citations["case_id"] == value["id"]]):
+            updated += 1
+        else:
+            logger.error({
+                "message": "Failed to reparse case",
+                "case_id": value["id"],
+                "location": "reparse.write_updates",
+            })
+    return updated
+
+
+def reparse(
+    workers: int,
+    batch_size: int,
+    checkpoint: str,
+    start_id: int = 0,
+    end_id: int | None = None,
+    court_name: str | None = None,
+    date_from=None,
+    date_to=None,
+):
+    last_id = load_checkpoint(checkpoint)
+    if last_id is not None:
+        start_id = max(start_id, last_id + 1)
+        logger.info(f"Resuming reparse from case id {start_id}")
+
+    scanned, changed, updated = 0, 0, 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for rows in iter_cases_for_reparse(
+            start_id=start_id,
+            end_id=end_id,
+            court_name=court_name,
+            date_from=date_from,
+            date_to=date_to,
+            batch_size=batch_size,
+        ):
+            rows_by_id = {row["id"]: row for row in rows}
+            parsed = executor.map(
+                parse_case_page,
+                [row["id"] for row in rows],
+                [row["case_text"] for row in rows],
+                chunksize=max(1, len(rows) // (workers * 4)),
+            )
+
+            values, new_citations = [], []
+            for case_id, case_info in parsed:
+                if case_info is None:
+                    continue
+                row = rows_by_id[case_id]
+                changed_values = get_changed_values(row, case_info)
+                if changed_values:
+                    values.append(changed_values)
+                    citation_ids = get_new_citations(row, changed_values)
+                    if citation_ids:
+                        new_citations.append({"case_id": case_id, "case_date": row["date"], "citation_ids": citation_ids})
+
+            updated += write_updates(values, new_citations)
+            scanned += len(rows)
+            changed += len(values)
+            save_checkpoint(checkpoint, rows[-1]["id"])
+
+            logger.info({
+                "message": "Reparse batch done",
+                "last_id": rows[-1]["id"],
+                "scanned": scanned,
+                "changed": changed,
+                "updated": updated,
+            })
+
+    return scanned, changed, updated
+
+
+def parse_date(value: str):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reparse stored scc_cases pages and backfill parsed columns.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--checkpoint", default="reparse_checkpoint.json")
+    parser.add_argument("--start-id", type=int, default=0)
+    parser.add_argument("--end-id", type=int, default=None)
+    parser.add_argument("--court", default=None, help="Limit to a court name (Node3)")
+    parser.add_argument("--date-from", type=parse_date, default=None, help="YYYY-MM-DD")
+    parser.add_argument("--date-to", type=parse_date, default=None, help="YYYY-MM-DD")
+    args = parser.parse_args()
+
+    scanned, changed, updated = reparse(
+        workers=args.workers,
+        batch_size=args.batch_size,
+        checkpoint=args.checkpoint,
+        start_id=args.start_id,
+        end_id=args.end_id,
+        court_name=args.court,
+        date_from=args.date_from,
+        date_to=args.date_to,
+    )
+    logger.info(f"Reparse finished: scanned={scanned}, changed={changed}, updated={updated}")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,7 @@ from dotenv import load_dotenv
 
 from app import constants
 from app.logger import logger
+from app.scrape.hedging import get_timeout
 
 load_dotenv()
 
@@ -29,7 +30,7 @@ def scrap_aspxauth_cookie(url, enc):
         "Priority": "u=0, i",
     }
 
-    response = requests.get(url + "/ApplicationLogin.aspx?enc=" + enc, headers=headers)
+    response = requests.get(url + "/ApplicationLogin.aspx?enc=" + enc, headers=headers, timeout=get_timeout("Login"))
     ASPXAUTH = response.request.headers["Cookie"]
 
     return ASPXAUTH
@@ -38,7 +39,7 @@ def scrap_aspxauth_cookie(url, enc):
 def login_to_website(url, username, password):
     payload = {"loginId": username, "pass": password, "force": True}
 
-    response = requests.get(url)
+    response = requests.get(url, timeout=get_timeout("Login"))
     x_access_token = response.cookies.get("x-access-token")
 
     soup = BeautifulSoup(response.content, "html.parser")
@@ -52,7 +53,7 @@ def login_to_website(url, username, password):
     }
 
     response = requests.post(
-        url + "/home/login", data=payload, cookies=cookie, headers=headers
+        url + "/home/login", data=payload, cookies=cookie, headers=headers, timeout=get_timeout("Login")
     )
     return response, crisp
 
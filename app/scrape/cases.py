@@ -7,6 +7,9 @@ class CasesScrapper:
 
     def extract_scc_id(self):
         section_head_text = self.soup.find("div", class_="SectionheadText")
+        if not section_head_text:
+            return None
+
         scc_id = section_head_text.find("b")
         if scc_id:
             return scc_id.text
@@ -27,4 +30,28 @@ class CasesScrapper:
 
     def extract_citation_links(self):
         citation_links = self.soup.find_all("a", class_="citalink")
-        return list(set([link.get("onclick").split("'")[1] for link in citation_links if link]))
\ No newline at end of file
+        return list(set([link.get("onclick").split("'")[1] for link in citation_links if link]))
+
+    def extract_case_information(self) -> dict:
+        return {
+            "scc_id": self.extract_scc_id(),
+            "bench_name": self.extract_bench_name(),
+            "case_no": self.extract_case_no(),
+            "advocates": self.extract_advocates(),
+            "citations": self.extract_citation_links(),
+        }
+
+
+def parse_case_page(case_id: int, page: str) -> tuple[int, dict | None]:
+    """
+    Module level entry point for process pools: parses a stored case page and returns it together with its id,
+    so results can be matched back to rows regardless of completion order. Returns None instead of raising,
+    one malformed page must not take down a whole reparse batch.
+    """
+    if not page:
+        return case_id, None
+
+    try:
+        return case_id, CasesScrapper(page).extract_case_information()
+    except Exception:
+        return case_id, None
@@ -1,21 +1,85 @@
 import re
 import time
+from datetime import datetime, timedelta
+
 import requests
 from bs4 import BeautifulSoup
 
 from app import constants
-from app.db.citations.crud import insert_citation
+from app.db.cases.crud import get_cases_by_scc_ids
+from app.db.citations.crud import insert_citation, insert_citation_references
+from app.db.precedents.crud import insert_pending_precedents, get_pending_precedents, delete_pending_precedent
 from app.logger import logger
+from app.scrape.hedging import get_hedged_requester, get_timeout
 
 
 
 class CitationsAPI:
 
+    def __init__(self, max_retries: int = 3, precedent_grace: timedelta = timedelta(days=7)):
+        # Requests give up after `max_retries` attempts, the queue's backoff handles longer outages
+        self.max_retries = max_retries
+        self.precedent_grace = precedent_grace
+
+    def process_citations(
+        self, aspxauth_container: dict, citation_ids: list[str], case_id: int
+    ) -> tuple[list[str], dict[str, datetime]]:
+        """
+        Statutes are downloaded, precedents are judgments the court crawl stores itself: the ones already in
+        `scc_cases` are referenced, the rest wait in `scc_pending_precedents` until the crawl reaches them.
+        That way every judgment is downloaded exactly once. Precedents the crawl doesn't store within
+        `precedent_grace` (journals, courts outside the tree, days crawled before) are downloaded like statutes.
+
+        Returns the citation ids that couldn't be fetched or stored, and the precedents still waiting for
+        the crawl with the time their download is due.
+        """
+        statutes = [citation_id for citation_id in citation_ids if self._get_citation_type(citation_id) == 'STATUE']
+        precedents = [citation_id for citation_id in citation_ids if self._get_citation_type(citation_id) == 'PRECEDENT']
+        failed, waiting = [], {}
+
+        stored_cases = get_cases_by_scc_ids(precedents)
+        references = [citation_id for citation_id in precedents if citation_id in stored_cases]
+        pending = [citation_id for citation_id in precedents if citation_id not in stored_cases]
+
+        if not insert_citation_references([
+            {
+                "unique_id": citation_id,
+                "case_id": case_id,
+                "referenced_case_id": stored_cases[citation_id][0],
+                "referenced_case_date": stored_cases[citation_id][1],
+            }
+            for citation_id in references
+        ]):
+            failed += references
+        if not insert_pending_precedents(pending, case_id):
+            failed += pending
+            pending = []
+
+        now = datetime.now()
+        for citation_id, waiting_since in get_pending_precedents(pending, case_id).items():
+            if waiting_since + self.precedent_grace > now:
+                waiting[citation_id] = waiting_since + self.precedent_grace
+            elif self.proccess_citation(aspxauth_container, citation_id, case_id) is None:
+                failed.append(citation_id)
+            else:
+                delete_pending_precedent(citation_id, case_id)
+
+        for citation_id in statutes:
+            if self.proccess_citation(aspxauth_container, citation_id, case_id) is None:
+                failed.append(citation_id)
+
+        return failed, waiting
+
     def proccess_citation(self, aspxauth_container: dict, citation_id: str, case_id: int):
-        citation_type = 'STATUE' if 'JTXT' in citation_id else 'PRECEDENT'
+        citation_type = self._get_citation_type(citation_id)
         citation_data = self._get_citation_data(aspxauth_container, citation_id, citation_type)
+        if citation_data is None:
+            return None
+
         citation_path = self._get_citation_path(citation_data)
         citation_text = self._get_text_from_citation(aspxauth_container, citation_id, citation_path)
+        if citation_text is None:
+            return None
 
         soup = BeautifulSoup(citation_text, 'lxml')
         citation_title = soup.find(class_="SectionheadText")
@@ -25,18 +89,19 @@ class CitationsAPI:
         else:
             citation_title = None
 
-        print('case_id',type(case_id), case_id, )
-
         citation = insert_citation(
             unique_id=citation_id,
             case_id=case_id,
             title=citation_title,
-            text=soup.prettify(),
+            text=citation_text,
             type=citation_type,
         )
 
         return citation
 
+    def _get_citation_type(self, citation_id: str) -> str:
+        return 'STATUE' if 'JTXT' in citation_id else 'PRECEDENT'
+
     def _get_citation_data(self, aspxauth_container: dict, citation_id: str, citation_type: str):
         url = f"{constants.BASE_URL}/Searcher.svc/SearchForCitaView"
         headers = self._get_headers(aspxauth_container)
@@ -55,9 +120,9 @@ class CitationsAPI:
             }
         }
 
-        while True:
+        for _ in range(self.max_retries):
             try:
-                response = requests.post(url, headers=headers, json=data)
+                response = requests.post(url, headers=headers, json=data, timeout=get_timeout("SearchForCitaView"))
                 return response.json()['d']
             except Exception as e:
                 logger.error({
@@ -98,14 +163,14 @@ class CitationsAPI:
             "DisplayNameFromTree": "",
         }
 
-        while True:
+        for _ in range(self.max_retries):
             try:
-                response = requests.post(url, headers=headers, json=data)
+                response = get_hedged_requester("GetPageData").post(url, headers=headers, json=data)
                 return response.json()['d']
             except Exception as e:
                 logger.error({
                     "message": "Error while getting text from citation.",
-                    "id": id,
+                    "citation": citation_id,
                     "path": path,
                     "exception": str(e),
                     "location": "get_text_from_citation",
@@ -1,7 +1,7 @@
+import json
 import threading
 import time
 from calendar import month
-from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import psycopg2
@@ -10,47 +10,156 @@ from requests import Response
 
 from app import constants
 from app.db.cases.crud import insert_case, get_case_by_scc_id, get_cases_by_date
+from app.db.citations.crud import link_pending_precedents
 from app.db.scraped.crud import insert_scraped_record
+from app.dedupe import check_case_for_duplicates
 from app.custom_dataclasses import Court
 from app.logger import logger
 from app.scrape.cases import CasesScrapper
-from app.scrape.citations import CitationsAPI
+from app.scrape.hedging import get_hedged_requester, get_timeout
+from app.scrape.relative_paths import map_relative_paths
+from app.scrape.scheduler import CrawlPriority, CrawlScheduler
+from app.scrape.tree_index import BrowseTreeIndex, is_stable
 
 
 class CourtsAPI:
-    def __init__(self):
-        self.citation_api = CitationsAPI()
-        self.cases_executor = ThreadPoolExecutor(max_workers=100)
-        self.citations_executor = ThreadPoolExecutor(max_workers=100)
-        self.records = []
-        self.record = {}
-
-    def get_courts_recursively(self, aspxauth_container: dict):
-        all_courts = {}
+    def __init__(
+        self,
+        tree_index_path: str | None = None,
+        refresh_days: int = 45,
+        priority: CrawlPriority | None = None,
+        tree_concurrency: int = 20,
+        leaf_concurrency: int = 80,
+        batch_xml_paths: bool = False,
+    ):
+        # Tree expansions and leaf page fetches have their own threads and caps, and run in `priority` order
+        self.scheduler = CrawlScheduler({"tree": tree_concurrency, "leaf": leaf_concurrency})
+        self.priority = priority or CrawlPriority()
+        self.tree_index_path = tree_index_path
+        self.tree_index = BrowseTreeIndex.load(tree_index_path)
+        self.refresh_days = refresh_days
+        # Counts only, the added and removed titles themselves are appended to `<tree_index_path>.diff.jsonl`
+        self.tree_diff = {"added": 0, "removed": 0}
+        self._tree_diff_file = None
+        self._tree_diff_lock = threading.Lock()
+        # Off by default, the answer format of batched lookups isn't confirmed yet (see tests/fixtures).
+        # Switched off for the rest of the run when SCC answers a batched lookup in an unknown shape
+        self.batch_xml_paths = batch_xml_paths
+
+    def get_courts_recursively(self, aspxauth_container: dict, save_interval: int = 300) -> list[dict]:
+        """
+        Traverses the browse tree of every country, waits until the traversal is done and saves the tree snapshot.
+        Returns the number of new and removed titles compared to the previous snapshot, the titles per Date node
+        are written to `<tree_index_path>.diff.jsonl` as they are found.
+        """
         countries = self.get_countries()
+        if self.tree_index_path:
+            self._tree_diff_file = open(f"{self.tree_index_path}.diff.jsonl", "w", encoding="utf-8")
+
+        try:
+            for country in countries:
+                self._submit("tree", [country], self._fetch_courts_and_subcourts, aspxauth_container, country, [country])
+
+            self.wait_for_traversal(save_interval)
+            self.save_tree_index()
+        finally:
+            if self._tree_diff_file:
+                self._tree_diff_file.close()
+                self._tree_diff_file = None
+
+        logger.info({"message": "Traversal done", **self.tree_diff, **get_hedged_requester("GetPageData").stats()})
+        return self.tree_diff
 
-        for country in countries:
-            courts_data = self._fetch_courts_and_subcourts(aspxauth_container, country, [country])
-            all_courts[country.key_formatted()] = courts_data
+    def _submit(self, kind: str, path: list[Court], fn, *args):
+        self.scheduler.submit(kind, self.priority.key(path), fn, *args)
+
+    def wait_for_traversal(self, save_interval: int = 300):
+        """
+        Blocks until every submitted task finished, saving the snapshot every `save_interval` seconds
+        so an interrupted run doesn't lose what it discovered.
+        """
+        while not self.scheduler.join(timeout=save_interval):
+            logger.info({"message": "Traversal in progress", **self.scheduler.stats()})
+            self.save_tree_index()
+
+    def save_tree_index(self):
+        if not self.tree_index_path:
+            return
 
-        return all_courts
+        try:
+            self.tree_index.save(self.tree_index_path)
+            with self._tree_diff_lock:
+                if self._tree_diff_file:
+                    self._tree_diff_file.flush()
+        except Exception as e:
+            logger.error({
+                "message": "Error saving browse tree index",
+                "exception": str(e),
+                "location": "save_tree_index",
+            })
 
-    def _fetch_courts_and_subcourts(self, aspxauth_container: dict, country: str, previous_courts: list) -> list:
+    def _fetch_courts_and_subcourts(self, aspxauth_container: dict, country: Court, previous_courts: list[Court]):
         """
-        Recursively retrieves court data from a hierarchical API structure, starting with a specified country and
-        traversing its court hierarchy. The function builds and sends POST requests to the API using authentication
-        from `aspxauth_container` and dynamically generated query parameters.
-
-        - It constructs a payload that specifies the current depth in the court hierarchy (using `previous_courts`)
-          and sends it to the API.
-        - For each response, it processes the retrieved court data. If a court item represents a final (or "Title") level,
-          additional data is fetched by calling `get_xml_path`, followed by `get_page_data` to retrieve the court's case page.
-          Case information is then scraped and stored in the database.
-        - If a court item has sub-levels, it recursively calls itself to explore further down the hierarchy,
-          ensuring each level's court data is processed before unwinding the recursion.
-        - The function aggregates data for all subcourts and ensures it's stored properly for each node in the hierarchy.
+        Recursively traverses the court hierarchy of a country (Node2 -> Node3 -> Year -> Month -> Date -> Title).
+
+        - Children of a node come from the browse tree snapshot when the node is stable (every date below it is older
+          than `refresh_days`), otherwise from a `SearchBrowseTree` request, which also refreshes the snapshot.
+        - Every child that has sub-levels is traversed by a new "tree" task of the scheduler.
+        - 'Title' children are the cases. Only titles that are new compared to the snapshot are fetched and stored:
+          their xml paths are resolved with one batched lookup, then every page is fetched by its own "leaf" task,
+          see `_fetch_case`. Added and removed titles are appended to the diff file, see `_record_tree_diff`.
         """
-        courts_scraped = []
+        children = None
+        if is_stable(previous_courts, self.refresh_days):
+            children = self.tree_index.children(previous_courts)
+
+        new_titles = []
+        if children is None:
+            children = self._search_browse_tree(aspxauth_container, country, previous_courts)
+            if children is None:
+                return
+
+            # New titles only stay in the snapshot once their page is stored, see `_fetch_title`
+            added, removed = self.tree_index.set_children(previous_courts, children, hold_level='Title')
+            new_titles = [court for court in added if court.level == 'Title']
+            removed_titles = [court for court in removed if court.level == 'Title']
+            if new_titles or removed_titles:
+                self._record_tree_diff(previous_courts, new_titles, removed_titles)
+
+        for court in children:
+            if court.level != 'Title':
+                self._submit("tree", previous_courts + [court], self._fetch_courts_and_subcourts, aspxauth_container, country, previous_courts + [court])
+
+        if not new_titles:
+            return
+
+        # One batched xml path lookup for the whole Date node, then the page fetches run concurrently
+        xml_paths = {}
+        if self.batch_xml_paths:
+            xml_paths = self.get_xml_paths(aspxauth_container, previous_courts, [title.key_formatted() for title in new_titles])
+        for title in new_titles:
+            path = previous_courts + [title]
+            self._submit("leaf", path, self._fetch_title, aspxauth_container, country, path, xml_paths.get(title.key_formatted()))
+
+    def _record_tree_diff(self, path: list[Court], added: list[Court], removed: list[Court]):
+        with self._tree_diff_lock:
+            self.tree_diff["added"] += len(added)
+            self.tree_diff["removed"] += len(removed)
+            if self._tree_diff_file:
+                self._tree_diff_file.write(json.dumps({
+                    "path": [court.key_formatted() for court in path],
+                    "added": [court.key_formatted() for court in added],
+                    "removed": [court.key_formatted() for court in removed],
+                }) + "\n")
+
+    def _fetch_title(self, aspxauth_container: dict, country: Court, path: list[Court], xml_path: str | None = None):
+        if self._fetch_case(aspxauth_container, country, path, xml_path):
+            self.tree_index.confirm(path)
+        else:
+            # Not remembered, so the next run tries it again
+            self.tree_index.remove(path)
+
+    def _search_browse_tree(self, aspxauth_container: dict, country: Court, previous_courts: list[Court]) -> list[Court] | None:
         url = f"{constants.BASE_URL}/Searcher.svc/SearchBrowseTree"
         headers = self._get_headers(aspxauth_container["ASPXAUTH"])
 
@@ -83,58 +192,69 @@ class CourtsAPI:
             # The response has two important fields for us: level and key
             # Where level is the type of court (e.g. "Year", "Month", "Title")
             # And key is the value of that level (e.g. "2021", "January", "Supreme Court")
-            response = requests.post(url, headers=headers, json=data)
+            response = requests.post(url, headers=headers, json=data, timeout=get_timeout("SearchBrowseTree"))
             if response.status_code == 200 and self._validate_court_response(response, country.level,
-                                                                             '_fetch_courts_and_subcourts'):
+                                                                             '_search_browse_tree'):
                 courts_data = response.json().get("d")[0].get("children", [])
-                for court_data in courts_data:
-                    court = Court(key=court_data.get("key"), level=court_data.get("level"))
-                    self.record[court.level] = court.key_formatted()
-
-                    # 'Title' here is the final level of the court hierarchy
-                    # If the court is at the final level, fetch additional data and store it in the database
-                    if court.level == 'Title':
-                        xml = self.get_xml_path(aspxauth_container, court.key_formatted())
-                        page = self.get_page_data(aspxauth_container, xml)
-                        self.record["page_xml"] = page
-
-                        # 'case_info' is a dictionary containing information about the case
-                        # Particulary: scc_id, bench_name, case_no, advocates, citations
-                        case_info = self.scrap_case_information_from_case_page(page)
-
-                        existing_case = get_case_by_scc_id(case_info.get("scc_id"))
-                        if existing_case:
-                            continue
-
-                        case_id = self.save_case_into_db(case_info=case_info, record=self.record)
-
-                        # For each citation in the case, scrap additional data and store it in the database
-                        self.citations_executor.submit(self._process_citations, aspxauth_container, case_info.get("citations"), case_id)
-
-                        # Store the record in the database
-                        # It is just for justification that the record was scraped
-                        insert_scraped_record(
-                            court_type=country.key,
-                            court_name=self.record.get("Node3"),
-                            year=int(self.record.get("Year")),
-                            month=int(self.record.get("Month")),
-                            day=int(self.record.get("Date")),
-                            completed=True,
-                        )
-
-                        self.records.append(self.record.copy())
-                    else:
-                        self.cases_executor.submit(self._fetch_courts_and_subcourts, aspxauth_container, country, previous_courts + [court])
+                return [Court(key=court_data.get("key"), level=court_data.get("level")) for court_data in courts_data]
 
         except Exception as e:
             logger.error({
                 "message": "Error fetching courts and subcourts",
                 "exception": str(e),
-                "location": "_fetch_courts_and_subcourts",
+                "location": "_search_browse_tree",
             })
             time.sleep(0.5)
 
-        return courts_scraped
+    def _fetch_case(self, aspxauth_container: dict, country: Court, path: list[Court], xml_path: str | None = None) -> bool:
+        """
+        Fetches the page of a 'Title' leaf, scrapes it and stores the case. Returns False if it couldn't be stored.
+        The xml path is looked up on its own when the batched lookup of the Date node didn't resolve it.
+        """
+        record = {court.level: court.key_formatted() for court in path}
+
+        try:
+            xml = xml_path or self.get_xml_path(aspxauth_container, path[-1].key_formatted())
+            page = self.get_page_data(aspxauth_container, xml)
+            record["page_xml"] = page
+
+            # 'case_info' is a dictionary containing information about the case
+            # Particulary: scc_id, bench_name, case_no, advocates, citations
+            case_info = self.scrap_case_information_from_case_page(page)
+
+            case_date = self._get_record_date(record)
+            existing_case = get_case_by_scc_id(case_info.get("scc_id"), date=case_date)
+            if existing_case:
+                return True
+
+            # Citations of the case are queued together with it and fetched by `app.citations_worker`
+            case_id = self.save_case_into_db(case_info=case_info, record=record)
+            if not case_id:
+                return False
+
+            # Store the record in the database
+            # It is just for justification that the record was scraped
+            insert_scraped_record(
+                court_type=country.key,
+                court_name=record.get("Node3"),
+                year=int(record.get("Year")),
+                month=int(record.get("Month")),
+                day=int(record.get("Date")),
+                completed=True,
+            )
+            return True
+
+        except Exception as e:
+            logger.error({
+                "message": "Error fetching case",
+                "title": path[-1].key_formatted(),
+                "exception": str(e),
+                "location": "_fetch_case",
+            })
+            return False
+
+    def _get_record_date(self, record: dict):
+        return datetime.strptime(f"{record.get('Year')}-{record.get('Month')}-{record.get('Date')}", "%Y-%m-%d").date()
 
     def _get_headers(self, aspxauth: str) -> dict:
         return {
@@ -229,9 +349,10 @@ class CourtsAPI:
             }
         }
 
-        year, month, day = self.record.get("Year"), self.record.get("Month"), self.record.get("Date")
+        record = {court.level: court.key_formatted() for court in previous_courts}
+        year, month, day = record.get("Year"), record.get("Month"), record.get("Date")
 
-        response = requests.post(url, headers=headers, json=data)
+        response = requests.post(url, headers=headers, json=data, timeout=get_timeout("SearchBrowseTree"))
         if response.status_code == 200 and self._validate_court_response(response, country.level, '_check_if_day_was_scraped'):
             response_titles = [children.get("title") for children in response.json().get("d")[0].get("children", [])]
 
@@ -255,12 +376,74 @@ class CourtsAPI:
     def get_xml_path(self, aspxauth_container, title):
         url = f"{constants.BASE_URL}/Searcher.svc/SearchRelativePath"
         headers = self._get_headers(aspxauth_container["ASPXAUTH"])
+        data = self._get_relative_path_payload(f'Title:"{title}"', 500)
 
-        data = {
+        while True:
+            try:
+                response = requests.post(url, headers=headers, json=data, timeout=get_timeout("SearchRelativePath"))
+                return response.json().get("d")
+            except Exception as e:
+                time.sleep(0.5)
+                logger.error({
+                    "message": "Error while getting XML Path for title. Retrying...",
+                    "exception": e,
+                    "location": "CourtAPI.get_xml_path",
+                })
+
+    def get_xml_paths(self, aspxauth_container, date_path: list[Court], titles: list[str], batch_size: int = 50) -> dict[str, str]:
+        """
+        Resolves the xml paths of many titles (the children of the Date node at `date_path`) with a few OR-combined
+        `SearchRelativePath` queries instead of one request per title. Queries are restricted to the Date node,
+        so a same-named judgment of another court or day can't supply the path. Titles that can't be mapped back
+        from the response are missing from the result, callers fall back to `get_xml_path` for them.
+        """
+        url = f"{constants.BASE_URL}/Searcher.svc/SearchRelativePath"
+        headers = self._get_headers(aspxauth_container["ASPXAUTH"])
+        date_query = self._generate_query_text(date_path)
+
+        # A quote inside a title would break the phrase query
+        titles = [title for title in titles if '"' not in title]
+        xml_paths = {}
+
+        for i in range(0, len(titles), batch_size):
+            if not self.batch_xml_paths:
+                break
+
+            batch = titles[i:i + batch_size]
+            title_query = " OR ".join(f'Title:"{title}"' for title in batch)
+            data = self._get_relative_path_payload(f"{date_query} AND ({title_query})", len(batch))
+
+            try:
+                response = requests.post(url, headers=headers, json=data, timeout=get_timeout("SearchRelativePath"))
+                result = response.json().get("d")
+            except Exception as e:
+                logger.error({
+                    "message": "Error while getting XML Paths for titles, falling back to single lookups",
+                    "exception": str(e),
+                    "location": "CourtAPI.get_xml_paths",
+                })
+                continue
+
+            mapped = map_relative_paths(result, batch)
+            if mapped is None:
+                # Every further batch would cost an extra request for nothing
+                self.batch_xml_paths = False
+                logger.error({
+                    "message": "Unknown SearchRelativePath answer, batched lookups disabled for this run",
+                    "response": str(result)[:2000],
+                    "location": "CourtAPI.get_xml_paths",
+                })
+                break
+            xml_paths.update(mapped)
+
+        return xml_paths
+
+    def _get_relative_path_payload(self, query_text: str, required_rows: int) -> dict:
+        return {
             "searchDetails": {
-                "QueryText": f'Title:"{title}"',
+                "QueryText": query_text,
                 "ReturnOnExit": False,
-                "RequiredRows": 500,
+                "RequiredRows": required_rows,
                 "SelectedCourt": "",
                 "HighlightTree": True,
                 "IsIclrContent": True,
@@ -278,18 +461,6 @@ class CourtsAPI:
             }
         }
 
-        while True:
-            try:
-                response = requests.post(url, headers=headers, json=data)
-                return response.json().get("d")
-            except Exception as e:
-                time.sleep(0.5)
-                logger.error({
-                    "message": "Error while getting XML Path for title. Retrying...",
-                    "exception": e,
-                    "location": "CourtAPI.get_xml_path",
-                })
-
     def get_page_data(self, aspxauth_container, xml_path):
         url = f"{constants.BASE_URL}/HelperServices/ServicesForCourtFunctionality.asmx/GetPageData"
         headers = self._get_headers(aspxauth_container["ASPXAUTH"])
@@ -314,7 +485,7 @@ class CourtsAPI:
 
         while True:
             try:
-                response = requests.post(url, headers=headers, json=data)
+                response = get_hedged_requester("GetPageData").post(url, headers=headers, json=data)
                 return response.json().get("d")
             except Exception as e:
                 time.sleep(0.5)
@@ -335,7 +506,7 @@ class CourtsAPI:
             })
             return
 
-        date = datetime.strptime(f"{record.get('Year')}-{record.get('Month')}-{record.get('Date')}", "%Y-%m-%d").date(),
+        date = self._get_record_date(record)
         case_id = insert_case(
             scc_id=record.get("scc_id"),
             bench_name=record.get("bench_name"),
@@ -347,24 +518,13 @@ class CourtsAPI:
             citations=record.get("citations"),
             case_text=record.get("page_xml"),
         )
-        return case_id
 
-    def scrap_case_information_from_case_page(self, page: str):
-        spider = CasesScrapper(page)
-        scc_id = spider.extract_scc_id()
-        bench_name = spider.extract_bench_name()
-        case_no = spider.extract_case_no()
-        advocates = spider.extract_advocates()
-        citations = spider.extract_citation_links()
+        # Citations of already stored cases that were waiting for this one
+        if case_id:
+            link_pending_precedents(record.get("scc_id"), case_id, date)
+            check_case_for_duplicates(case_id, date, record.get("page_xml"))
 
-        return {
-            "scc_id": scc_id,
-            "bench_name": bench_name,
-            "case_no": case_no,
-            "advocates": advocates,
-            "citations": citations,
-        }
+        return case_id
 
-    def _process_citations(self, aspxauth_container: dict, citations: list[str], case_id: int):
-        for citation_id in citations:
-            self.citation_api.proccess_citation(aspxauth_container, citation_id, case_id)
+    def scrap_case_information_from_case_page(self, page: str):
+        return CasesScrapper(page).extract_case_information()
@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+
+from app import constants
+from app.logger import logger
+
+
+def get_timeout(endpoint: str) -> tuple[float, float]:
+    return constants.REQUEST_TIMEOUTS.get(endpoint, constants.DEFAULT_REQUEST_TIMEOUT)
+
+
+class LatencyTracker:
+    def __init__(self, size: int = 1000):
+        self._latencies = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def __len__(self):
+        return len(self._latencies)
+
+    def percentile(self, percentile: float) -> float | None:
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100))]
+
+
+class HedgedRequester:
+    """
+    POSTs to one endpoint with its timeouts and, when a request is slower than the p95 observed for the endpoint,
+    sends a duplicate and returns whichever answers first. Hedges are limited to `budget` of all requests,
+    so at most that much extra load is sent to SCC.
+    """
+    def __init__(self, endpoint: str, budget: float = 0.05, enabled: bool = True, min_samples: int = 50,
+                 max_workers: int = 256, report_every: int = 1000):
+        self.endpoint = endpoint
+        self.timeout = get_timeout(endpoint)
+        self.budget = budget
+        self.enabled = enabled
+        self.min_samples = min_samples
+        self.report_every = report_every
+        self.latencies = LatencyTracker()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"hedge-{endpoint}")
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        with self._lock:
+            self._requests += 1
+            requests_count = self._requests
+
+        primary = self.executor.submit(self._post, url, kwargs)
+        hedge_after = self._hedge_after()
+        if hedge_after is None:
+            return self._result(primary, requests_count)
+
+        done, _ = wait([primary], timeout=hedge_after)
+        if done or not self._take_hedge():
+            return self._result(primary, requests_count)
+
+        hedge = self.executor.submit(self._post, url, kwargs)
+        done, _ = wait([primary, hedge], return_when=FIRST_COMPLETED)
+
+        # A failed attempt doesn't win, wait for the other one instead
+        winner = next(iter(done))
+        if winner.exception() is not None:
+            winner = hedge if winner is primary else primary
+        loser = hedge if winner is primary else primary
+        loser.cancel()
+
+        if winner is hedge:
+            with self._lock:
+                self._hedge_wins += 1
+        return self._result(winner, requests_count)
+
+    def _post(self, url: str, kwargs: dict) -> requests.Response:
+        started = time.monotonic()
+        try:
+            return requests.post(url, **kwargs)
+        finally:
+            # Timed out attempts count too, they are the tail we hedge against
+            self.latencies.add(time.monotonic() - started)
+
+    def _hedge_after(self) -> float | None:
+        if not self.enabled or len(self.latencies) < self.min_samples:
+            return None
+        return self.latencies.percentile(95)
+
+    def _take_hedge(self) -> bool:
+        with self._lock:
+            if self._hedges >= self.budget * self._requests:
+                return False
+            self._hedges += 1
+            return True
+
+    def _result(self, future, requests_count: int) -> requests.Response:
+        if self.report_every and requests_count % self.report_every == 0:
+            logger.info({"message": "Hedged requests stats", **self.stats()})
+        return future.result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests_count, hedges, hedge_wins = self._requests, self._hedges, self._hedge_wins
+
+        return {
+            "endpoint": self.endpoint,
+            "requests": requests_count,
+            "hedges": hedges,
+            "hedge_rate": hedges / requests_count if requests_count else 0,
+            "hedge_wins": hedge_wins,
+            "hedge_win_rate": hedge_wins / hedges if hedges else 0,
+            "p50": self.latencies.percentile(50),
+            "p95": self.latencies.percentile(95),
+            "p99": self.latencies.percentile(99),
+        }
+
+
+_requesters = {}
+_requesters_lock = threading.Lock()
+
+
+def get_hedged_requester(endpoint: str) -> HedgedRequester:
+    """
+    One requester per endpoint and process, so every caller shares the endpoint's latency observations and budget.
+    """
+    with _requesters_lock:
+        if endpoint not in _requesters:
+            _requesters[endpoint] = HedgedRequester(
+                endpoint,
+                budget=float(os.getenv("SCC_HEDGE_BUDGET", 0.05)),
+                enabled=os.getenv("SCC_HEDGE_REQUESTS", "true").lower() == "true",
+            )
+        return _requesters[endpoint]
@@ -0,0 +1,35 @@
+import json
+from collections import defaultdict
+
+
+def map_relative_paths(result, titles: list[str]) -> dict[str, str] | None:
+    """
+    Maps a `SearchRelativePath` answer back to the queried titles, None when the answer has an unknown shape.
+
+    A single title is answered with the bare path. Several titles are accepted only as a list of records,
+    objects or JSON encoded objects, holding "Title" and "Path" like the other SCC search records.
+    """
+    if isinstance(result, str) and len(titles) == 1:
+        return {titles[0]: result} if result else {}
+    if not isinstance(result, list):
+        return None
+
+    titles_by_name = {title.strip().casefold(): title for title in titles}
+    paths = defaultdict(set)
+
+    for record in result:
+        if isinstance(record, str):
+            try:
+                record = json.loads(record)
+            except ValueError:
+                return None
+        if not isinstance(record, dict) or not isinstance(record.get("Title"), str) \
+                or not isinstance(record.get("Path"), str):
+            return None
+
+        title = titles_by_name.get(record["Title"].split("$")[0].strip().casefold())
+        if title:
+            paths[title].add(record["Path"])
+
+    # A title answered with several paths is ambiguous, it's looked up on its own
+    return {title: found.pop() for title, found in paths.items() if len(found) == 1}
@@ -0,0 +1,106 @@
+import itertools
+import queue
+import threading
+from collections import Counter
+from datetime import date
+
+from app.custom_dataclasses import Court
+from app.logger import logger
+from app.scrape.tree_index import path_end_date
+
+PRIORITY_POLICIES = ("newest", "courts", "coverage")
+
+
+class CrawlPriority:
+    """
+    Orders crawl work, smaller keys run first:
+
+    - newest: the most recent dates first. Nodes above the Year level have no date and always go first,
+      they are cheap and discover the recent parts of the tree.
+    - courts: the courts named in `courts` first (in the given order), newest first within each.
+    - coverage: courts with the fewest scraped days first, newest first within each.
+
+    Ties are broken in favour of courts that got fewer tasks so far, so one large court can't hold up the others.
+    """
+    def __init__(self, policy: str = "newest", courts: list[str] | None = None, coverage: dict[str, int] | None = None):
+        if policy not in PRIORITY_POLICIES:
+            raise ValueError(f"Unknown crawl priority policy {policy}, expected one of {PRIORITY_POLICIES}")
+
+        self.policy = policy
+        self.courts = {court: rank for rank, court in enumerate(courts or [])}
+        self.coverage = coverage or {}
+        self._submitted = Counter()
+        self._lock = threading.Lock()
+
+    def key(self, path: list[Court]) -> tuple:
+        levels = {court.level: court.key_formatted() for court in path}
+        court_name = levels.get("Node3")
+        newest = -(path_end_date(path) or date.max).toordinal()
+
+        if self.policy == "courts":
+            primary = (self.courts.get(court_name, len(self.courts)) if court_name else -1, newest)
+        elif self.policy == "coverage":
+            primary = (self.coverage.get(court_name, 0) if court_name else -1, newest)
+        else:
+            primary = (newest,)
+
+        with self._lock:
+            self._submitted[court_name] += 1
+            submitted = self._submitted[court_name]
+
+        return primary + (submitted,)
+
+
+class CrawlScheduler:
+    """
+    One priority queue and one pool of worker threads per kind of work (e.g. tree expansions, leaf fetches,
+    citations), so each kind has its own concurrency cap and can't starve the others of threads.
+    """
+    def __init__(self, caps: dict[str, int]):
+        self.caps = caps
+        self._queues = {kind: queue.PriorityQueue() for kind in caps}
+        self._sequence = itertools.count()
+        self._pending = 0
+        self._pending_condition = threading.Condition()
+
+        for kind, cap in caps.items():
+            for i in range(cap):
+                thread = threading.Thread(target=self._work, args=(kind,), name=f"{kind}-{i}", daemon=True)
+                thread.start()
+
+    def submit(self, kind: str, priority: tuple, fn, *args):
+        with self._pending_condition:
+            self._pending += 1
+        # The sequence number keeps equal priorities FIFO and never lets the queue compare functions
+        self._queues[kind].put((priority, next(self._sequence), fn, args))
+
+    def _work(self, kind: str):
+        tasks = self._queues[kind]
+        while True:
+            _, _, fn, args = tasks.get()
+            try:
+                fn(*args)
+            except Exception as e:
+                logger.error({
+                    "message": "Error running scheduled task",
+                    "kind": kind,
+                    "exception": str(e),
+                    "location": "CrawlScheduler._work",
+                })
+            finally:
+                with self._pending_condition:
+                    self._pending -= 1
+                    if not self._pending:
+                        self._pending_condition.notify_all()
+
+    def join(self, timeout: float | None = None) -> bool:
+        """
+        Waits until every submitted task (including the ones they submit) finished, returns False on timeout.
+        """
+        with self._pending_condition:
+            return self._pending_condition.wait_for(lambda: not self._pending, timeout=timeout)
+
+    def stats(self) -> dict:
+        with self._pending_condition:
+            pending = self._pending
+        return {"pending": pending, **{f"queued_{kind}": tasks.qsize() for kind, tasks in self._queues.items()}}
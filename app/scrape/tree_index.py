@@ -0,0 +1,233 @@
+import calendar
+import gzip
+import json
+import os
+import threading
+from array import array
+from datetime import date, timedelta
+
+from app.custom_dataclasses import Court
+from app.logger import logger
+
+INDEX_VERSION = 1
+
+
+class BrowseTreeIndex:
+    """
+    Snapshot of the SCC browse tree (Node2 -> Node3 -> Year -> Month -> Date -> Title) discovered by previous runs.
+
+    Nodes are kept column-wise in int arrays (parent, key, level) pointing into a table of interned strings,
+    so millions of leaves take a few dozen bytes each instead of a Python object per node.
+    Node 0 is the root above the countries.
+    """
+    ROOT = 0
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._strings = [""]
+        self._string_ids = {"": 0}
+        self._parents = array("i", [-1])
+        self._keys = array("i", [0])
+        self._levels = array("i", [0])
+        self._children: dict[int, array] = {}
+        # Nodes whose complete list of children is known
+        self._expanded: set[int] = set()
+        # Listed children whose leaf work hasn't finished yet, they aren't saved until confirmed
+        self._held: set[int] = set()
+
+    def _intern(self, value: str) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(value)
+            self._string_ids[value] = string_id
+        return string_id
+
+    def _court(self, node: int) -> Court:
+        return Court(key=self._strings[self._keys[node]], level=self._strings[self._levels[node]])
+
+    def _find_child(self, node: int, court: Court) -> int | None:
+        key, level = self._string_ids.get(court.key), self._string_ids.get(court.level)
+        if key is None or level is None:
+            return None
+
+        for child in self._children.get(node, ()):
+            if self._keys[child] == key and self._levels[child] == level:
+                return child
+
+    def _add_node(self, parent: int, court: Court) -> int:
+        node = len(self._parents)
+        self._parents.append(parent)
+        self._keys.append(self._intern(court.key))
+        self._levels.append(self._intern(court.level))
+        self._children.setdefault(parent, array("i")).append(node)
+        return node
+
+    def _node(self, path: list[Court], create: bool = False) -> int | None:
+        node = self.ROOT
+        for court in path:
+            child = self._find_child(node, court)
+            if child is None:
+                if not create:
+                    return None
+                child = self._add_node(node, court)
+            node = child
+        return node
+
+    def children(self, path: list[Court]) -> list[Court] | None:
+        """
+        Children of the node at `path`, or None if the node was never listed completely.
+        """
+        with self._lock:
+            node = self._node(path)
+            if node is None or node not in self._expanded:
+                return None
+            return [self._court(child) for child in self._children.get(node, ())]
+
+    def set_children(
+        self, path: list[Court], children: list[Court], hold_level: str | None = None
+    ) -> tuple[list[Court], list[Court]]:
+        """
+        Stores a fresh listing of the node at `path` and returns the (added, removed) children.
+        Children present in both listings keep their subtrees. Added children at `hold_level` are held
+        until `confirm`, a snapshot saved meanwhile leaves them out and doesn't count the node as listed.
+        """
+        with self._lock:
+            node = self._node(path, create=True)
+            previous = {(self._keys[child], self._levels[child]): child for child in self._children.get(node, ())}
+
+            current, added = array("i"), []
+            for court in children:
+                child = previous.pop((self._intern(court.key), self._intern(court.level)), None)
+                if child is None:
+                    child = len(self._parents)
+                    self._parents.append(node)
+                    self._keys.append(self._string_ids[court.key])
+                    self._levels.append(self._string_ids[court.level])
+                    added.append(court)
+                    if court.level == hold_level:
+                        self._held.add(child)
+                current.append(child)
+
+            self._children[node] = current
+            self._expanded.add(node)
+            # Removed subtrees become unreachable and are dropped on the next save
+            self._held.difference_update(previous.values())
+            return added, [self._court(child) for child in previous.values()]
+
+    def confirm(self, path: list[Court]):
+        """
+        Keeps a held node in the snapshot, e.g. a Title whose page was stored.
+        """
+        with self._lock:
+            node = self._node(path)
+            if node is not None:
+                self._held.discard(node)
+
+    def remove(self, path: list[Court]):
+        """
+        Forgets the node at `path`, e.g. a Title whose page couldn't be stored, so the next run sees it as new.
+        Its parent's listing is no longer complete, the parent is queried again even when it is stable.
+        """
+        with self._lock:
+            node = self._node(path)
+            if node is None:
+                return
+            parent = self._parents[node]
+            siblings = self._children.get(parent)
+            if siblings is not None:
+                self._children[parent] = array("i", (child for child in siblings if child != node))
+            self._expanded.discard(parent)
+            self._held.discard(node)
+
+    def save(self, path: str):
+        """
+        Writes the reachable part of the tree, renumbered breadth first, atomically to a gzipped JSON file.
+        Held nodes are left out and their parents saved as not listed, so the next run queries them again.
+        """
+        with self._lock:
+            order, strings, string_ids = [self.ROOT], [], {}
+            new_ids = {self.ROOT: 0}
+            nodes, expanded = [], []
+            incomplete = {self._parents[node] for node in self._held}
+
+            def string_id(value_id: int) -> int:
+                if value_id not in string_ids:
+                    string_ids[value_id] = len(strings)
+                    strings.append(self._strings[value_id])
+                return string_ids[value_id]
+
+            for node in order:
+                if node in self._expanded and node not in incomplete:
+                    expanded.append(new_ids[node])
+                for child in self._children.get(node, ()):
+                    if child in self._held:
+                        continue
+                    new_ids[child] = len(order)
+                    order.append(child)
+                    nodes.extend((new_ids[node], string_id(self._keys[child]), string_id(self._levels[child])))
+
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "strings": strings, "nodes": nodes, "expanded": expanded}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str | None) -> "BrowseTreeIndex":
+        index = cls()
+        if not path or not os.path.exists(path):
+            return index
+
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error({
+                "message": "Failed to load browse tree index, starting from scratch",
+                "path": path,
+                "exception": str(e),
+            })
+            return index
+
+        if data.get("version") != INDEX_VERSION:
+            return index
+
+        string_ids = [index._intern(value) for value in data["strings"]]
+        nodes = data["nodes"]
+        for i in range(0, len(nodes), 3):
+            node = len(index._parents)
+            index._parents.append(nodes[i])
+            index._keys.append(string_ids[nodes[i + 1]])
+            index._levels.append(string_ids[nodes[i + 2]])
+            index._children.setdefault(nodes[i], array("i")).append(node)
+        index._expanded = set(data["expanded"])
+        return index
+
+
+def path_end_date(path: list[Court]) -> date | None:
+    """
+    The last day covered by the node at `path`, None for nodes above the Year level (or with unexpected keys).
+    """
+    levels = {court.level: court.key_formatted() for court in path}
+
+    try:
+        year = int(levels["Year"])
+        if "Month" not in levels:
+            return date(year, 12, 31)
+        month = int(levels["Month"])
+        if "Date" not in levels:
+            return date(year, month, calendar.monthrange(year, month)[1])
+        return date(year, month, int(levels["Date"]))
+    except (KeyError, ValueError):
+        return None
+
+
+def is_stable(path: list[Court], refresh_days: int, today: date | None = None) -> bool:
+    """
+    A node is stable when everything below it is dated more than `refresh_days` ago, SCC doesn't add
+    judgments to such days anymore and the snapshot can be reused instead of querying the node again.
+    Nodes above the Year level can always get new children.
+    """
+    today = today or date.today()
+    end = path_end_date(path)
+    return end is not None and end < today - timedelta(days=refresh_days)
@@ -0,0 +1,43 @@
+"""
+`SearchRelativePath` answers in tests/fixtures. The batch answer has never been captured: the `.synthetic` fixture
+is written in the record format of the other SCC search answers ("Title"/"Path" records) and only pins down what
+`map_relative_paths` accepts. Batched lookups stay off by default (`SCC_BATCH_XML_PATHS`) until it is replaced by
+an answer logged by `CourtsAPI.get_xml_paths`.
+"""
+import json
+import os
+
+from app.scrape.relative_paths import map_relative_paths
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_fixture(name: str):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return json.load(f)["d"]
+
+
+def test_single_title_is_answered_with_the_bare_path():
+    result = load_fixture("search_relative_path_single.json")
+
+    assert map_relative_paths(result, ["State of Punjab v. Gurmit Singh"]) == {
+        "State of Punjab v. Gurmit Singh": "Judgments\\SC\\1996\\1996_3_384.xml",
+    }
+
+
+def test_batch_maps_records_and_skips_ambiguous_titles():
+    result = load_fixture("search_relative_path_batch.synthetic.json")
+    titles = ["State of Punjab v. Gurmit Singh", "Vishaka v. State of Rajasthan", "Missing v. Title"]
+
+    assert map_relative_paths(result, titles) == {
+        "State of Punjab v. Gurmit Singh": "Judgments\\SC\\1996\\1996_3_384.xml",
+    }
+
+
+def test_unknown_shapes_are_rejected():
+    titles = ["A v. B", "C v. D"]
+
+    assert map_relative_paths("Judgments\\SC\\1996\\1996_3_384.xml", titles) is None
+    assert map_relative_paths({"children": []}, titles) is None
+    assert map_relative_paths([{"key": "A v. B", "path": "x.xml"}], titles) is None
+    assert map_relative_paths(["not json"], titles) is None
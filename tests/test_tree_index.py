@@ -0,0 +1,80 @@
+from datetime import date
+
+from app.custom_dataclasses import Court
+from app.scrape.tree_index import BrowseTreeIndex, is_stable
+
+DATE_PATH = [
+    Court(key="  India", level="Node2"),
+    Court(key="Supreme Court of India", level="Node3"),
+    Court(key="2015", level="Year"),
+    Court(key="03", level="Month"),
+    Court(key="12", level="Date"),
+]
+A = Court(key="A v. B", level="Title")
+B = Court(key="C v. D", level="Title")
+
+
+def test_set_children_diffs_listings():
+    index = BrowseTreeIndex()
+
+    assert index.children(DATE_PATH) is None
+    assert index.set_children(DATE_PATH, [A]) == ([A], [])
+    assert index.set_children(DATE_PATH, [A, B]) == ([B], [])
+    assert index.set_children(DATE_PATH, [B]) == ([], [A])
+    assert index.children(DATE_PATH) == [B]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = BrowseTreeIndex()
+    index.set_children(DATE_PATH[:-1], [DATE_PATH[-1]])
+    index.set_children(DATE_PATH, [A, B])
+
+    path = str(tmp_path / "tree.json.gz")
+    index.save(path)
+    loaded = BrowseTreeIndex.load(path)
+
+    assert loaded.children(DATE_PATH[:-1]) == [DATE_PATH[-1]]
+    assert loaded.children(DATE_PATH) == [A, B]
+
+
+def test_removed_title_is_fetched_again_after_reload(tmp_path):
+    index = BrowseTreeIndex()
+    index.set_children(DATE_PATH, [A, B])
+    index.remove(DATE_PATH + [B])
+
+    path = str(tmp_path / "tree.json.gz")
+    index.save(path)
+    loaded = BrowseTreeIndex.load(path)
+
+    # The Date node is stable, but its listing is incomplete so it must be queried again
+    assert is_stable(DATE_PATH, refresh_days=45, today=date(2024, 1, 1))
+    assert loaded.children(DATE_PATH) is None
+    assert loaded.set_children(DATE_PATH, [A, B]) == ([B], [])
+
+
+def test_titles_waiting_for_their_page_are_not_saved(tmp_path):
+    index = BrowseTreeIndex()
+    index.set_children(DATE_PATH[:-1], [DATE_PATH[-1]])
+    index.set_children(DATE_PATH, [A, B], hold_level="Title")
+    index.confirm(DATE_PATH + [A])
+
+    # The run is killed while B is still queued
+    path = str(tmp_path / "tree.json.gz")
+    index.save(path)
+    loaded = BrowseTreeIndex.load(path)
+
+    assert loaded.children(DATE_PATH[:-1]) == [DATE_PATH[-1]]
+    assert loaded.children(DATE_PATH) is None
+    assert loaded.set_children(DATE_PATH, [A, B]) == ([B], [])
+
+
+def test_confirmed_titles_complete_the_listing(tmp_path):
+    index = BrowseTreeIndex()
+    index.set_children(DATE_PATH, [A, B], hold_level="Title")
+    index.confirm(DATE_PATH + [A])
+    index.confirm(DATE_PATH + [B])
+
+    path = str(tmp_path / "tree.json.gz")
+    index.save(path)
+
+    assert BrowseTreeIndex.load(path).children(DATE_PATH) == [A, B]